@@ -1,6 +1,10 @@
 import os
 import tempfile
-from autogen.coding import LocalCommandLineCodeExecutor
+import threading
+from llm_cache import SQLiteLLMCache
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
 
 class AgentConfig:
     """Configuration settings for the AutoGen application."""
@@ -68,8 +72,36 @@ class AgentConfig:
             },
         }
     
+    @staticmethod
+    def stream_enabled():
+        return os.environ.get("LLM_STREAM", "1").lower() not in ("0", "false", "no")
+
+    @staticmethod
+    def orchestration_mode():
+        """"groupchat" (round-robin GroupChat, the default) or "workflow" (parallel DAG, opt-in)."""
+        return os.environ.get("ORCHESTRATION_MODE", "groupchat").lower()
+
+    @staticmethod
+    def get_llm_cache():
+        """Process-wide LLM response cache, or None when LLM_CACHE_DISABLED is set."""
+        global _llm_cache
+        if os.environ.get("LLM_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+            return None
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = SQLiteLLMCache(
+                    os.environ.get(
+                        "LLM_CACHE_PATH",
+                        os.path.join(os.path.expanduser("~"), ".cache", "stock_analysis", "llm_cache.sqlite"),
+                    ),
+                    ttl=float(os.environ.get("LLM_CACHE_TTL", 86400)),
+                    max_bytes=int(os.environ.get("LLM_CACHE_MAX_MB", 256)) * 1024 * 1024,
+                )
+            return _llm_cache
+
     @staticmethod
     def get_code_executor_config():
+        from autogen.coding import LocalCommandLineCodeExecutor
         temp_dir = tempfile.TemporaryDirectory()
         return LocalCommandLineCodeExecutor(
             timeout=30,
@@ -0,0 +1,5 @@
+# AutoGen hook points shared by the layers that observe agent conversations
+# (streaming, tracing), so neither has to import the other.
+
+# Called with every message an agent is about to send; must return the message.
+MESSAGE_HOOK = "process_message_before_send"
@@ -1,45 +1,168 @@
 import autogen
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from history_store import validate_ticker
 from tools import FinanceTools
+from streaming import stream_conversation, tool_result_event
+from tracing import run_in_context, trace_conversation, tracer
 from autogen.agentchat import register_function
 from agent_config import AgentConfig
 
-def orchestrate_agents(user_request, finance_reporting_analyst, technical_analyst, strategy_agent, user):
+TOOL_FUNCTIONS = {
+    "finance_data_fetch": FinanceTools.finance_data_fetch,
+    "technical_analysis_tool": FinanceTools.technical_analysis_tool,
+    "risk_assessment_tool": FinanceTools.risk_assessment_tool,
+    "strategy_signal_tool": FinanceTools.strategy_signal_tool,
+}
+
+# One initial message plus one turn each for the three analysts.
+PRECOMPUTED_MAX_ROUND = 4
+
+_TICKER_PATTERN = re.compile(r"\$?\b([A-Za-z]{1,5}(?:[.-][A-Za-z]{1,2})?)\b")
+_NOT_TICKERS = {
+    "A", "AI", "AN", "AND", "ARE", "AT", "BE", "BUY", "CEO", "DO", "EMA", "EPS", "ETF", "EU", "FOR",
+    "HOLD", "I", "IN", "IPO", "IS", "IT", "MACD", "ME", "MY", "OF", "ON", "OR", "PE", "RSI", "SELL",
+    "SMA", "THE", "TO", "UK", "US", "USA", "USD",
+}
+# Lower-case words are only taken as tickers when they are not plain English.
+_COMMON_WORDS = _NOT_TICKERS | {
+    "ABOUT", "AFTER", "ALL", "ALSO", "AM", "ANY", "AS", "ASK", "BASED", "BEST", "BUT", "BY", "CAN", "COULD",
+    "DAY", "DAYS", "DOES", "EACH", "FROM", "GET", "GIVE", "GOOD", "GROW", "HAS", "HAVE", "HE", "HER", "HIGH",
+    "HIS", "HOW", "IF", "INTO", "ITS", "JUST", "LAST", "LIKE", "LONG", "LOOK", "LOW", "MAKE", "MANY", "MAY",
+    "MORE", "MOST", "MUCH", "MUST", "NEAR", "NEED", "NEXT", "NO", "NOT", "NOW", "OFF", "OK", "ONE", "ONLY",
+    "OUR", "OUT", "OVER", "PLAN", "PLEASE", "PRICE", "RATE", "RISK", "RUN", "SAFE", "SEE", "SHARE", "SHE",
+    "SHORT", "SHOW", "SO", "SOME", "STOCK", "TELL", "TERM", "THAN", "THAT", "THEM", "THEN", "THEY", "THIS",
+    "TIME", "TREND", "UP", "USE", "VERY", "WANT", "WAS", "WE", "WEEK", "WELL", "WHAT", "WHEN", "WHICH",
+    "WHO", "WHY", "WILL", "WITH", "WORTH", "WOULD", "YEAR", "YES", "YET", "YOU", "YOUR",
+}
+
+def _valid_ticker(symbol):
+    try:
+        return validate_ticker(symbol)
+    except ValueError:
+        return None
+
+def extract_ticker(user_request):
+    """Best-effort ticker from a free-text request, in order of preference: a
+    $-prefixed symbol, the first all-caps word that is not a common acronym,
+    then the first all-lower-case word that is not a common English word.
+    Capitalised words (sentence starts, company names) are never taken."""
+    upper, lower = [], []
+    for match in _TICKER_PATTERN.finditer(user_request):
+        symbol = match.group(1)
+        if match.group(0).startswith("$"):
+            return _valid_ticker(symbol)
+        if symbol.isupper() and symbol not in _NOT_TICKERS:
+            upper.append(symbol)
+        elif symbol.islower() and symbol.upper() not in _COMMON_WORDS:
+            lower.append(symbol)
+    for symbol in upper + lower:
+        ticker = _valid_ticker(symbol)
+        if ticker:
+            return ticker
+    return None
+
+@tracer.traced("precompute")
+def precompute_tool_results(ticker, on_result=None):
+    with ThreadPoolExecutor(max_workers=len(TOOL_FUNCTIONS)) as pool:
+        futures = {run_in_context(pool, func, ticker): name for name, func in TOOL_FUNCTIONS.items()}
+        results = {}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if on_result:
+                on_result(futures[future], results[futures[future]])
+        return {name: results[name] for name in TOOL_FUNCTIONS}
+
+def build_seeded_request(user_request, ticker, tool_results):
+    sections = [
+        user_request,
+        f"The tool results for {ticker} have already been computed and are listed below. "
+        "Use them directly and do not call the tools again.",
+    ]
+    for name, result in tool_results.items():
+        sections.append(f"### {name}\n{result}")
+    return "\n\n".join(sections)
+
+@contextmanager
+def _without_tools(agents):
+    """Hide the agents' tool schemas from the model for the duration, e.g.
+    while every tool result is already in the seeded request."""
+    hidden = []
+    for agent in agents:
+        if agent.llm_config and agent.llm_config.get("tools"):
+            hidden.append((agent, agent.llm_config.pop("tools")))
+            agent.client = autogen.OpenAIWrapper(**agent.llm_config)
+    try:
+        yield
+    finally:
+        for agent, tools in hidden:
+            agent.llm_config["tools"] = tools
+            agent.client = autogen.OpenAIWrapper(**agent.llm_config)
+
+def register_tools(finance_reporting_analyst, technical_analyst, strategy_agent, user):
         tools_list = AgentConfig.get_tools_list()
+        callers = {
+            "finance_data_fetch": [finance_reporting_analyst],
+            "technical_analysis_tool": [technical_analyst],
+            "risk_assessment_tool": [strategy_agent],
+            "strategy_signal_tool": [strategy_agent]
+        }
+        for tool_name, tool_func in TOOL_FUNCTIONS.items():
+            for caller in callers[tool_name]:
+                register_function(
+                    tool_func,
+                    caller=caller,
+                    executor=user,
+                    name=tool_name,
+                    description= tools_list[tool_name]["function"]["description"]
+                )
+
+@tracer.traced("analysis")
+def orchestrate_agents(user_request, finance_reporting_analyst, technical_analyst, strategy_agent, user,
+                       precompute=False, use_cache=True, register=True, on_message=None, on_token=None, mode=None):
         try:
-            # Register tools
-            for tool_name, tool_func in [
-                ("technical_analysis_tool", FinanceTools.technical_analysis_tool),
-                ("risk_assessment_tool", FinanceTools.risk_assessment_tool),
-                ("strategy_signal_tool", FinanceTools.strategy_signal_tool)
-            ]:
-                callers = {
-                    "finance_data_fetch": [finance_reporting_analyst],
-                    "technical_analysis_tool": [technical_analyst],
-                    "risk_assessment_tool": [strategy_agent],
-                    "strategy_signal_tool": [strategy_agent]
-                }
-                for caller in callers[tool_name]:
-                    register_function(
-                        tool_func,
-                        caller=caller,
-                        executor=user,
-                        name=tool_name,
-                        description= tools_list[tool_name]["function"]["description"]
-                    )
+            if register:
+                register_tools(finance_reporting_analyst, technical_analyst, strategy_agent, user)
+
+            if (mode or AgentConfig.orchestration_mode()) == "workflow":
+                from workflow import run_analysis_workflow
+                return run_analysis_workflow(
+                    user_request, finance_reporting_analyst, technical_analyst, strategy_agent, user,
+                    precompute=precompute, use_cache=use_cache, on_message=on_message, on_token=on_token
+                )
+
+            # Seed the conversation with every tool result so agents go straight to interpretation
+            max_round = 9
+            ticker = extract_ticker(user_request) if precompute else None
+            if ticker:
+                on_result = None
+                if on_message:
+                    on_result = lambda name, result: on_message(tool_result_event(name, result))
+                tool_results = precompute_tool_results(ticker, on_result=on_result)
+                user_request = build_seeded_request(user_request, ticker, tool_results)
+                max_round = PRECOMPUTED_MAX_ROUND
 
             groupchat = autogen.GroupChat(
                 agents=[user, finance_reporting_analyst, technical_analyst, strategy_agent],
                 messages=[],
-                max_round=9,
+                max_round=max_round,
                 speaker_selection_method="round_robin"
             )
 
             manager = autogen.GroupChatManager(
                 groupchat=groupchat,
-                llm_config={"config_list": AgentConfig.get_llm_config(), "timeout": 280, "temperature": 0.5},
+                llm_config={"config_list": AgentConfig.get_llm_config(), "timeout": 280, "temperature": 0.5, "cache_seed": None},
             )
 
-            result = user.initiate_chat(manager, message=user_request)
+            cache = AgentConfig.get_llm_cache() if use_cache else None
+            agents = [user, finance_reporting_analyst, technical_analyst, strategy_agent]
+            # Round robin never hands a seeded chat back to the executor, so a
+            # tool call there would go unanswered: take the tools away instead.
+            with _without_tools(agents if ticker else []), \
+                    stream_conversation(agents, on_message=on_message, on_token=on_token), \
+                    trace_conversation(agents), tracer.span("groupchat", max_round=max_round):
+                result = user.initiate_chat(manager, message=user_request, cache=cache)
 
             if hasattr(result, "chat_history") and result.chat_history:
                 for msg in reversed(result.chat_history):
@@ -49,4 +172,4 @@ def orchestrate_agents(user_request, finance_reporting_analyst, technical_analys
                 return result.summary
             return "Analysis completed successfully. No detailed result was returned."
         except Exception as e:
-            return f"Error during analysis: {str(e)}"
\ No newline at end of file
+            return f"Error during analysis: {str(e)}"
@@ -0,0 +1,147 @@
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from agents import Agents
+from agent_orchestrator import register_tools
+
+class AgentSet:
+    """One set of analysis agents with tools registered and its own code executor."""
+    def __init__(self):
+        self.agents = Agents()
+        self.members = self.agents.initialize_agents()
+        if not all(self.members):
+            self.close()
+            raise RuntimeError("Error initializing agents")
+        register_tools(*self.members)
+        self.api_key = os.environ.get("OPENAI_API_KEY")
+        self.last_used = time.monotonic()
+
+    def is_stale(self):
+        return self.api_key != os.environ.get("OPENAI_API_KEY")
+
+    def reset(self):
+        for agent in self.members:
+            agent.reset()
+
+    def close(self):
+        self.agents.temp_dir.cleanup()
+
+class AgentPool:
+    """Process-wide pool of warm agent sets.
+
+    Sets are built on demand up to ``max_size`` and handed out exclusively,
+    so concurrent requests never share conversation state. Checked-in sets
+    are reset and reused; sets idle longer than ``max_idle`` seconds, or
+    returned as broken, are evicted and their temp directories removed, as
+    are sets built with a different OpenAI API key than the current one.
+    """
+    def __init__(self, max_size=4, max_idle=1800, factory=AgentSet):
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.factory = factory
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.created = 0
+        self.evicted = 0
+        self.checkouts = 0
+
+    def checkout(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._evict_idle()
+            while True:
+                if self._closed:
+                    raise RuntimeError("agent pool is closed")
+                while self._idle and self._idle[-1].is_stale():
+                    self._discard(self._idle.pop())
+                if self._idle:
+                    self.checkouts += 1
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("no agent set available")
+                self._cond.wait(remaining)
+        try:
+            agent_set = self.factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+            self.checkouts += 1
+        return agent_set
+
+    def checkin(self, agent_set, broken=False):
+        if not broken:
+            try:
+                agent_set.reset()
+            except Exception:
+                broken = True
+        with self._cond:
+            if broken or self._closed:
+                self._discard(agent_set)
+            else:
+                agent_set.last_used = time.monotonic()
+                self._idle.append(agent_set)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        agent_set = self.checkout(timeout=timeout)
+        broken = False
+        try:
+            yield agent_set
+        except BaseException:
+            broken = True
+            raise
+        finally:
+            self.checkin(agent_set, broken=broken)
+
+    def _discard(self, agent_set):
+        self._size -= 1
+        self.evicted += 1
+        agent_set.close()
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.max_idle
+        for agent_set in [s for s in self._idle if s.last_used < cutoff]:
+            self._idle.remove(agent_set)
+            self._discard(agent_set)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "created": self.created,
+                "evicted": self.evicted,
+                "checkouts": self.checkouts,
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.pop())
+            self._cond.notify_all()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_agent_pool(max_size=None):
+    """Return the process-wide pool, creating it on first use (AGENT_POOL_SIZE sets the default size)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = AgentPool(max_size=max_size or int(os.environ.get("AGENT_POOL_SIZE", 4)))
+            atexit.register(_pool.close)
+        return _pool
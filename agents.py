@@ -39,6 +39,8 @@ class Agents:
                     "config_list": self.config_list,
                     "timeout": 280,
                     "temperature": 0.5,
+                    "cache_seed": None,
+                    "stream": AgentConfig.stream_enabled(),
                 },
             )
 
@@ -63,6 +65,8 @@ class Agents:
                     "config_list": self.config_list,
                     "timeout": 200,
                     "temperature": 0.5,
+                    "cache_seed": None,
+                    "stream": AgentConfig.stream_enabled(),
                 },
             )
 
@@ -104,6 +108,8 @@ class Agents:
                     "config_list": self.config_list,
                     "timeout": 300,
                     "temperature": 0.5,
+                    "cache_seed": None,
+                    "stream": AgentConfig.stream_enabled(),
                 },
             )
 
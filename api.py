@@ -0,0 +1,252 @@
+"""Headless HTTP API for the stock analysis agents and tools.
+
+Run with ``uvicorn api:app`` (or ``python api.py``). Concurrent identical
+requests share one execution, and the number of distinct executions is
+bounded, so a burst of callers asking about the same hot ticker costs one
+upstream fetch and one agent conversation.
+"""
+import asyncio
+import json
+import os
+from collections import deque
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Literal
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from agent_orchestrator import TOOL_FUNCTIONS, extract_ticker, orchestrate_agents
+from agent_pool import get_agent_pool
+from history_store import validate_ticker
+from tools import FinanceTools, fetch_scheduler
+
+API_WORKERS = int(os.environ.get("API_WORKERS", 4))
+API_MAX_QUEUE = int(os.environ.get("API_MAX_QUEUE", 32))
+STREAM_BUFFER = 256
+
+# History periods the market-data layer accepts.
+Period = Literal["1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max"]
+
+class Overloaded(Exception):
+    """Raised when every worker is busy and the admission queue is full."""
+
+class Flight:
+    """One execution shared by every caller with the same key.
+
+    Events published while it runs are buffered and replayed to late
+    subscribers: every message event, but only the token events since the
+    last message (at most ``STREAM_BUFFER``), since each message supersedes
+    the tokens that streamed it. Each subscriber has a bounded queue, and a
+    slow reader loses token events first.
+    """
+    def __init__(self):
+        self.future = asyncio.get_running_loop().create_future()
+        self.events = []
+        self.tokens = deque(maxlen=STREAM_BUFFER)
+        self.subscribers = []
+
+    def publish(self, event):
+        if event["kind"] == "token":
+            self.tokens.append(event)
+        else:
+            self.tokens.clear()
+            self.events.append(event)
+        for queue in self.subscribers:
+            _offer(queue, event)
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=STREAM_BUFFER)
+        for event in [*self.events, *self.tokens]:
+            _offer(queue, event)
+        self.subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        if queue in self.subscribers:
+            self.subscribers.remove(queue)
+
+def _offer(queue, event):
+    if queue.full():
+        if event["kind"] == "token":
+            return
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one run on a bounded executor.
+
+    At most ``max_workers`` runs execute at once and ``max_queue`` more wait
+    for a worker. Starting a new key beyond that raises ``Overloaded``.
+    Callers that join an existing run cost nothing.
+    """
+    def __init__(self, max_workers=API_WORKERS, max_queue=API_MAX_QUEUE):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api")
+        self.capacity = max_workers + max_queue
+        self._flights = {}
+        self.started = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def join(self, key, func, *args):
+        """Return the flight for ``key``, starting ``func(*args, publish)`` on a worker if none is running."""
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            return flight
+        if len(self._flights) >= self.capacity:
+            self.rejected += 1
+            raise Overloaded(f"{len(self._flights)} requests in progress")
+        loop = asyncio.get_running_loop()
+        flight = self._flights[key] = Flight()
+        self.started += 1
+
+        def publish(event):
+            loop.call_soon_threadsafe(flight.publish, event)
+
+        task = loop.run_in_executor(self.executor, func, *args, publish)
+        task.add_done_callback(lambda t: self._land(key, flight, t))
+        return flight
+
+    def _land(self, key, flight, task):
+        del self._flights[key]
+        error = CancelledError("shutting down") if task.cancelled() else task.exception()
+        if error is not None:
+            flight.future.set_exception(error)
+            # Streaming callers get the error as an event and may never await the future.
+            flight.future.exception()
+            flight.publish({"kind": "error", "content": str(error)})
+        else:
+            flight.future.set_result(task.result())
+            flight.publish({"kind": "result", "content": task.result()})
+
+    async def run(self, key, func, *args):
+        # Shielded so a caller that disconnects does not cancel the run for everyone else.
+        return await asyncio.shield(self.join(key, func, *args).future)
+
+    def stats(self):
+        return {
+            "in_flight": len(self._flights),
+            "capacity": self.capacity,
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+flights = SingleFlight()
+
+def _analyze(request, precompute, use_cache, publish):
+    with get_agent_pool().lease() as agent_set:
+        return orchestrate_agents(
+            request,
+            *agent_set.members,
+            precompute=precompute,
+            use_cache=use_cache,
+            register=False,
+            on_message=publish,
+            on_token=lambda text: publish({"agent": None, "kind": "token", "content": text}),
+        )
+
+def _run_tool(name, ticker, publish):
+    return json.loads(TOOL_FUNCTIONS[name](ticker))
+
+def _snapshot(tickers, period, publish):
+    frame = FinanceTools.indicator_snapshot(tickers, period=period)
+    return json.loads(frame.to_json(orient="index"))
+
+class AnalysisRequest(BaseModel):
+    request: str
+    precompute: bool = True
+    use_cache: bool = True
+
+@asynccontextmanager
+async def lifespan(app):
+    get_agent_pool(max_size=API_WORKERS)
+    yield
+    flights.close()
+
+app = FastAPI(title="AI Stock Analysis API", lifespan=lifespan)
+
+def _symbol(ticker):
+    try:
+        return validate_ticker(ticker)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _coalesced(key, func, *args):
+    try:
+        return await flights.run(key, func, *args)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+@app.post("/analysis")
+async def analysis(body: AnalysisRequest, stream: bool = False):
+    ticker = extract_ticker(body.request)
+    key = (
+        "analysis",
+        ticker,
+        date.today().isoformat(),
+        " ".join(body.request.lower().split()),
+        body.precompute,
+        body.use_cache,
+    )
+    args = (body.request, body.precompute, body.use_cache)
+    if not stream:
+        result = await _coalesced(key, _analyze, *args)
+        if str(result).startswith("Error during analysis"):
+            raise HTTPException(status_code=502, detail=result)
+        return {"ticker": ticker, "result": result}
+    try:
+        flight = flights.join(key, _analyze, *args)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    queue = flight.subscribe()
+
+    async def events():
+        try:
+            while True:
+                event = await queue.get()
+                yield json.dumps(event, default=str) + "\n"
+                if event["kind"] in ("result", "error"):
+                    return
+        finally:
+            # Also runs when the client disconnects mid-stream.
+            flight.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.get("/tools/{name}")
+async def tool(name: str, ticker: str):
+    if name not in TOOL_FUNCTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown tool {name}")
+    ticker = _symbol(ticker)
+    result = await _coalesced(("tool", name, ticker, date.today().isoformat()), _run_tool, name, ticker)
+    if "error" in result:
+        raise HTTPException(status_code=502, detail=result["error"])
+    return result
+
+@app.get("/indicators")
+async def indicators(tickers: str = Query(..., description="Comma-separated symbols"), period: Period = "6mo"):
+    symbols = sorted({_symbol(t) for t in tickers.split(",") if t.strip()})
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No tickers given")
+    try:
+        return await _coalesced(("indicators", tuple(symbols), period, date.today().isoformat()), _snapshot, symbols, period)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "flights": flights.stats(),
+        "agent_pool": get_agent_pool().stats(),
+        "fetch": fetch_scheduler.metrics(),
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=os.environ.get("API_HOST", "127.0.0.1"), port=int(os.environ.get("API_PORT", 8000)))
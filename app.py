@@ -1,27 +1,39 @@
 import streamlit as st
 import os
+import threading
+import time
 from datetime import datetime
-from openai import OpenAI
 import uuid
-from agents import Agents
-from agent_orchestrator import orchestrate_agents
 from app_config import AppConfig
-from tools import FinanceTools
+from agent_config import AgentConfig
+from result_store import get_result_store
+from tracing import tracer
 
-class OpenAIClient:
-    """Manages OpenAI client initialization."""
-    def __init__(self):
-        self.client = OpenAI(
-            api_key=os.environ.get("OPENAI_API_KEY"),
-            base_url=os.environ.get("OPENAI_BASE_URL")
-        )
+# autogen, openai, yfinance and pandas are only imported by the modules below,
+# which are loaded on first use so the first page paints without them.
+
+AGENT_LABELS = {
+    "supervisor": "🧭 Supervisor",
+    "finance_reporting_analyst": "📑 Finance Reporting Analyst",
+    "technical_analyst": "📉 Technical Analyst",
+    "strategy_agent": "🎯 Strategy Agent",
+}
+
+JOB_POLL_INTERVAL = 1.0
+QUOTE_POLL_INTERVAL = 0.5
+REPORT_REUSE_AGE = 3600
 
 class StockAnalysisApp:
     """Main application class for the AI Stock Analysis Platform."""
     def __init__(self):
         self.config = AppConfig()
-        self.openai_client = OpenAIClient()
-        self.agents = Agents()
+        self.precompute_tools = True
+        self.use_llm_cache = True
+        self.stream_messages = True
+        self.run_in_background = True
+        self.reuse_reports = True
+        self.selected_result = None
+        self.orchestration_mode = AgentConfig.orchestration_mode()
 
     def render_sidebar(self):
         with st.sidebar:
@@ -34,16 +46,165 @@ class StockAnalysisApp:
             )
             if api_key:
                 os.environ["OPENAI_API_KEY"] = api_key
+            self.orchestration_mode = st.selectbox(
+                "Orchestration",
+                ["groupchat", "workflow"],
+                index=1 if AgentConfig.orchestration_mode() == "workflow" else 0,
+                help="workflow runs the reporting and technical analysts in parallel and the strategy agent once both finish; groupchat lets every agent speak in turn"
+            )
+            self.precompute_tools = st.checkbox(
+                "Pre-compute tool results",
+                value=True,
+                help="Fetch all tool data in parallel before the agents start, saving LLM round-trips"
+            )
+            self.use_llm_cache = st.checkbox(
+                "Use LLM response cache",
+                value=True,
+                help="Reuse model replies for identical prompts instead of calling the model again"
+            )
+            self.run_in_background = st.checkbox(
+                "Run in background",
+                value=True,
+                help="Queue the analysis on a worker process and poll for progress instead of blocking the page"
+            )
+            self.reuse_reports = st.checkbox(
+                "Reuse recent reports",
+                value=True,
+                help="Show the stored report for a request analyzed in the last hour instead of running the agents again"
+            )
+            self.stream_messages = st.checkbox(
+                "Stream agent messages",
+                value=True,
+                help="Show each agent message and tool result as soon as it is produced"
+            )
+            llm_cache = AgentConfig.get_llm_cache()
+            if llm_cache is not None:
+                stats = llm_cache.stats()
+                st.caption(f"LLM cache: {stats['entries']} entries, {stats['hit_rate']:.0%} hit rate")
+
+            st.divider()
+            st.header("📚 Recent Analyses")
+            history = get_result_store().history(owner=st.session_state.owner, limit=20)
+            self.selected_result = st.selectbox(
+                "Open a stored report:",
+                [None] + [entry["id"] for entry in history],
+                format_func=lambda analysis_id: "—" if analysis_id is None else next(
+                    f"{entry['ticker'] or '?'} · {datetime.fromtimestamp(entry['created_at']):%Y-%m-%d %H:%M} · {entry['request'][:40]}"
+                    for entry in history if entry["id"] == analysis_id
+                )
+            )
 
             st.divider()
             st.header("📊 Quick Stock Info")
             quick_ticker = st.text_input("Enter ticker for quick view:", placeholder="e.g., AAPL")
             if quick_ticker:
-                quick_ticker = quick_ticker.upper()
-                metrics = FinanceTools.get_stock_metrics(quick_ticker)
+                self.render_quotes([quick_ticker], self.render_quick_view)
+
+            st.divider()
+            st.header("👀 Watchlist")
+            watchlist = st.text_input("Tickers to watch:", placeholder="e.g., AAPL, MSFT, NVDA")
+            if watchlist:
+                self.render_quotes(watchlist.replace(" ", ",").split(","), self.render_watchlist)
+
+    @staticmethod
+    def render_quotes(tickers, render):
+        """Render quotes without waiting for them; while any is still loading,
+        poll in a fragment and rerun the page once they have all landed."""
+        from quote_service import get_quote_service
+        service = get_quote_service()
+        loading = None in service.get_many(tickers, timeout=0).values()
+
+        @st.fragment(run_every=QUOTE_POLL_INTERVAL if loading else None)
+        def quotes_fragment():
+            quotes = service.get_many(tickers, timeout=0)
+            if loading and None not in quotes.values():
+                st.rerun()
+            render(quotes)
+
+        quotes_fragment()
+
+    @staticmethod
+    def render_quick_view(quotes):
+        for metrics in quotes.values():
+            if metrics is None:
+                st.caption("Loading quote...")
+            else:
                 for metric, value in metrics.items():
                     st.metric(metric, value)
 
+    @staticmethod
+    def render_watchlist(quotes):
+        st.dataframe(
+            [{"Ticker": ticker, **(metrics or {"Current Price": "Loading..."})} for ticker, metrics in quotes.items()],
+            hide_index=True,
+            use_container_width=True
+        )
+
+    def stream_renderers(self):
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+        feed = st.container()
+        live = st.empty()
+        tokens = []
+        script_ctx = get_script_run_ctx()
+        render_lock = threading.Lock()
+
+        def from_any_thread(render):
+            # Workflow steps call back from pool threads. Streamlit drops elements written
+            # from a thread without the script's run context, and the writes must not interleave.
+            def callback(payload):
+                with render_lock:
+                    add_script_run_ctx(threading.current_thread(), script_ctx)
+                    render(payload)
+            return callback
+
+        def on_message(event):
+            tokens.clear()
+            live.empty()
+            if event["agent"] == "supervisor" and event["kind"] == "message":
+                return
+            label = AGENT_LABELS.get(event["agent"], event["agent"])
+            with feed:
+                if event["kind"] == "tool_result":
+                    with st.expander(f"{label} · tool result {event.get('tool', '')}".strip()):
+                        st.code(event["content"], language="json")
+                elif event["kind"] == "tool_call":
+                    st.caption(f"{label} calls `{event['content']}`")
+                else:
+                    st.markdown(f"**{label}**")
+                    st.markdown(event["content"])
+
+        def on_token(text):
+            tokens.append(text)
+            live.markdown("".join(tokens))
+
+        return from_any_thread(on_message), from_any_thread(on_token)
+
+    @staticmethod
+    def save_result(user_request, analysis_data):
+        if str(analysis_data).startswith("Error during analysis"):
+            st.error(analysis_data)
+            return
+        get_result_store().save(user_request, analysis_data, owner=st.session_state.owner)
+
+    def render_job_status(self, user_request):
+        job_id = st.session_state.jobs.get(user_request)
+        if not job_id:
+            return
+        from job_queue import get_job_queue
+        job = get_job_queue().get(job_id)
+        if job is None:
+            st.session_state.jobs.pop(user_request)
+        elif job["status"] == "done":
+            # The worker has already filed the report under this session's key.
+            st.session_state.jobs.pop(user_request)
+        elif job["status"] == "failed":
+            st.session_state.jobs.pop(user_request)
+            st.error(f"Analysis failed: {job['error']}")
+        else:
+            st.progress(job["progress"], text=job["message"] or f"🤖 Analysis {job['status']}...")
+            time.sleep(JOB_POLL_INTERVAL)
+            st.rerun()
+
     def render_main_content(self):
         st.markdown('<h1 class="main-header">📈 AI Stock Analysis Platform</h1>', unsafe_allow_html=True)
         st.markdown('<div style="text-align:center;"><strong>Powered by AutoGen AI Agents</strong></div>', unsafe_allow_html=True)
@@ -57,32 +218,63 @@ class StockAnalysisApp:
             )
 
         if st.button("Run Analysis", disabled=not(user_request)):
-            if not os.environ.get("OPENAI_API_KEY"):
+            store = get_result_store()
+            recent = None
+            if self.reuse_reports:
+                recent = store.latest(user_request, max_age=REPORT_REUSE_AGE, owner=st.session_state.owner)
+            if recent is not None:
+                st.info(
+                    f"Showing the report generated at {datetime.fromtimestamp(recent['created_at']):%H:%M}. "
+                    "Untick \"Reuse recent reports\" to run the agents again."
+                )
+            elif not os.environ.get("OPENAI_API_KEY"):
                 st.error("⚠️ Please provide your OpenAI API key in the sidebar")
+            elif self.run_in_background:
+                from job_queue import get_job_queue
+                st.session_state.jobs[user_request] = get_job_queue().submit(
+                    user_request,
+                    owner=st.session_state.owner,
+                    precompute=self.precompute_tools,
+                    use_cache=self.use_llm_cache,
+                    mode=self.orchestration_mode
+                )
             else:
+                from agent_pool import get_agent_pool
+                from agent_orchestrator import orchestrate_agents
+                on_message, on_token = self.stream_renderers() if self.stream_messages else (None, None)
                 with st.spinner("🤖 AI agents are analyzing the stock... This may take a few moments."):
-                    agents = self.agents.initialize_agents()
-                    if all(agents):
-                        analysis_data = orchestrate_agents(user_request, *agents)
-                        st.session_state.analysis_results[user_request] = {
-                            "timestamp": datetime.now(),
-                            "request": user_request,
-                            "result": analysis_data
-                        }
-                        st.session_state.chat_history.append({
-                            "timestamp": datetime.now(),
-                            "ticker": user_request,
-                            "request": user_request,
-                            "result": analysis_data
-                        })
-
-        if user_request in st.session_state.analysis_results:
+                    try:
+                        with tracer.span("ui.analysis") as span, get_agent_pool().lease() as agent_set:
+                            st.session_state.last_trace_id = span.trace_id
+                            analysis_data = orchestrate_agents(
+                                user_request,
+                                *agent_set.members,
+                                precompute=self.precompute_tools,
+                                use_cache=self.use_llm_cache,
+                                register=False,
+                                mode=self.orchestration_mode,
+                                on_message=on_message,
+                                on_token=on_token
+                            )
+                    except (RuntimeError, TimeoutError) as e:
+                        st.error(f"Error initializing agents: {e}")
+                    else:
+                        self.save_result(user_request, analysis_data)
+
+        self.render_job_status(user_request)
+
+        store = get_result_store()
+        latest = store.latest(user_request, owner=st.session_state.owner) if user_request else None
+        # An explicitly opened report wins over the newest one for the query.
+        analysis_id = self.selected_result if self.selected_result is not None else latest["id"] if latest else None
+        report = store.load(analysis_id) if analysis_id is not None else None
+        if report is not None:
             st.header("📋 Analysis Results")
-            st.markdown(st.session_state.analysis_results[user_request]["result"], unsafe_allow_html=True)
+            st.markdown(report, unsafe_allow_html=True)
             file_id = uuid.uuid1()
             st.download_button(
                 label="📥 Download Analysis Report",
-                data=st.session_state.analysis_results[user_request]["result"],
+                data=report,
                 file_name=f"{file_id}_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
                 mime="text/markdown"
             )
@@ -93,11 +285,27 @@ class StockAnalysisApp:
             "Always consult with a financial advisor before making investment decisions."
         )
 
+    def render_timing_breakdown(self):
+        trace_id = st.session_state.get("last_trace_id")
+        if not trace_id:
+            return
+        stages = tracer.breakdown(trace_id)
+        if stages:
+            with st.sidebar:
+                st.divider()
+                st.header("⏱️ Last Analysis Timing")
+                st.dataframe(
+                    [{key: round(value, 1) if isinstance(value, float) else value for key, value in stage.items()} for stage in stages],
+                    hide_index=True,
+                    use_container_width=True
+                )
+
     def run(self):
         self.config.setup_page()
         self.config.initialize_session_state()
         self.render_sidebar()
         self.render_main_content()
+        self.render_timing_breakdown()
 
 if __name__ == "__main__":
     app = StockAnalysisApp()
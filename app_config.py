@@ -1,3 +1,4 @@
+import uuid
 import streamlit as st
 
 class AppConfig:
@@ -50,7 +51,17 @@ class AppConfig:
 
     @staticmethod
     def initialize_session_state():
-        if 'analysis_results' not in st.session_state:
-            st.session_state.analysis_results = {}
-        if 'chat_history' not in st.session_state:
-            st.session_state.chat_history = []
+        """Set up per-session state, including the ``owner`` key stored analyses are scoped to.
+
+        The key is kept in the ``?session=`` URL parameter so a reload (or a
+        bookmark) brings the same history back. It is not authentication:
+        anyone who has the link can read that session's whole history, so
+        do not share the URL.
+        """
+        # Reports live in the result store; the session only tracks running jobs.
+        if 'jobs' not in st.session_state:
+            st.session_state.jobs = {}
+        if 'owner' not in st.session_state:
+            st.session_state.owner = st.query_params.get("session") or uuid.uuid4().hex
+        if st.query_params.get("session") != st.session_state.owner:
+            st.query_params["session"] = st.session_state.owner
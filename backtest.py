@@ -0,0 +1,181 @@
+"""Backtest the strategy_agent Buy/Sell/Hold rules over locally stored daily bars.
+
+Runs fully offline against the history store (``STOCK_HISTORY_DIR``); every
+stored ticker is tested unless symbols are given. The store normally holds
+two years per ticker; ``--backfill`` first loads a longer period from
+upstream:
+
+    python backtest.py AAPL MSFT --backfill 10y
+    python backtest.py --start 2015-01-01 --workers 8
+    python backtest.py AAPL MSFT --horizon 10 --output backtest.csv
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import indicators
+from history_store import HistoryStore
+
+TRADING_DAYS = 252
+
+def _max_drawdown(equity):
+    return float((equity / np.maximum.accumulate(equity) - 1).min()) if len(equity) else 0.0
+
+def backtest_closes(close, horizon=20, cost=0.0005, allow_short=False):
+    """Evaluate the rules over one ticker's close series in a single vectorized pass.
+
+    A Buy goes long and a Sell goes flat (short with ``allow_short``); Hold keeps
+    the previous position. Positions take effect on the next bar. A signal is a
+    hit when the close ``horizon`` bars later moved in the signalled direction.
+    """
+    if horizon < 1:
+        raise ValueError(f"horizon must be at least 1 bar, got {horizon}")
+    macd_line, signal_line = indicators.macd(close)
+    rsi_values = indicators.rsi(close, window=14)
+    valid = rsi_values.notna().to_numpy()
+    signal = indicators.strategy_signal(macd_line, signal_line, rsi_values)[valid]
+    prices = close.to_numpy(dtype="f8")[valid]
+    if len(prices) < 2:
+        return None
+
+    target = np.where(signal == "Buy", 1.0, np.where(signal == "Sell", -1.0 if allow_short else 0.0, np.nan))
+    position = pd.Series(target).ffill().fillna(0.0).to_numpy()
+    held = np.concatenate([[0.0], position[:-1]])
+    returns = np.concatenate([[0.0], prices[1:] / prices[:-1] - 1])
+    turnover = np.abs(np.diff(held, prepend=0.0))
+    strategy = held * returns - cost * turnover
+    equity = np.cumprod(1 + strategy)
+
+    forward = np.full(len(prices), np.nan)
+    forward[:-horizon] = prices[horizon:] / prices[:-horizon] - 1
+    scored = ~np.isnan(forward)
+    buys, sells = (signal == "Buy") & scored, (signal == "Sell") & scored
+    years = len(prices) / TRADING_DAYS
+    return {
+        "bars": len(prices),
+        "total_return": float(equity[-1] - 1),
+        "annual_return": float(equity[-1] ** (1 / years) - 1) if equity[-1] > 0 else -1.0,
+        "buy_and_hold": float(prices[-1] / prices[0] - 1),
+        "max_drawdown": _max_drawdown(equity),
+        "buy_and_hold_drawdown": _max_drawdown(prices),
+        "trades": int(np.count_nonzero(turnover)),
+        "exposure": float(np.mean(held != 0)),
+        "buy_signals": int(buys.sum()),
+        "buy_hit_rate": float(np.mean(forward[buys] > 0)) if buys.any() else np.nan,
+        "sell_signals": int(sells.sum()),
+        "sell_hit_rate": float(np.mean(forward[sells] < 0)) if sells.any() else np.nan,
+    }
+
+def _backtest_ticker(root, ticker, start, horizon, cost, allow_short):
+    # Runs in a worker process; reads the memmapped bars straight from disk.
+    records = HistoryStore(root).read(ticker, start=start)
+    close = pd.Series(np.array(records["Close"]))
+    result = backtest_closes(close, horizon=horizon, cost=cost, allow_short=allow_short)
+    return ticker, result
+
+def backfill(root, tickers, period, source=None, max_workers=8):
+    """Load ``period`` of daily bars (e.g. ``10y`` or ``max``) into the store for ``tickers``.
+
+    Fetches go through the shared fetch scheduler, so concurrent tickers are
+    batched and rate-limited. Returns ``{ticker: bars_added}``; tickers whose
+    fetch fails map to None.
+    """
+    if source is None:
+        from tools import fetch_scheduler as source
+    store = HistoryStore(root, source=source)
+
+    def load(ticker):
+        try:
+            return ticker, store.update(ticker, period=period)
+        except Exception as e:
+            print(f"Backfill failed for {ticker}: {e}", file=sys.stderr)
+            return ticker, None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(pool.map(load, tickers))
+
+def run_backtest(root, tickers=None, start=None, horizon=20, cost=0.0005, allow_short=False, max_workers=None):
+    """Backtest ``tickers`` (default: everything stored under ``root``) across a process pool.
+
+    Returns ``(results, summary)``: a per-ticker frame and the aggregate
+    metrics, including throughput in bars per second. A ticker that fails
+    (unknown symbol, unreadable data, a crashed worker) is reported on stderr
+    and counted under ``failed``; the others still run.
+    """
+    tickers = [t.upper() for t in tickers] if tickers else HistoryStore(root).tickers()
+    started = time.perf_counter()
+    rows, failed = {}, 0
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        futures = {
+            pool.submit(_backtest_ticker, root, ticker, start, horizon, cost, allow_short): ticker for ticker in tickers
+        }
+        for future, ticker in futures.items():
+            try:
+                _, result = future.result()
+            except Exception as e:
+                print(f"Backtest failed for {ticker}: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            if result is not None:
+                rows[ticker] = result
+    elapsed = time.perf_counter() - started
+    results = pd.DataFrame.from_dict(rows, orient="index")
+    bars = int(results["bars"].sum()) if not results.empty else 0
+    summary = {
+        "tickers": len(results),
+        "failed": failed,
+        "bars": bars,
+        "seconds": elapsed,
+        "bars_per_second": bars / elapsed if elapsed else 0.0,
+    }
+    if not results.empty:
+        for column in ("total_return", "buy_and_hold", "max_drawdown", "buy_hit_rate", "sell_hit_rate"):
+            summary[f"mean_{column}"] = float(results[column].mean())
+        summary["beat_buy_and_hold"] = float((results["total_return"] > results["buy_and_hold"]).mean())
+    return results, summary
+
+def main(argv=None):
+    from tools import HISTORY_STORE_DIR
+
+    parser = argparse.ArgumentParser(description="Backtest the strategy rules on stored daily bars.")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols (default: every stored ticker)")
+    parser.add_argument("--store", default=HISTORY_STORE_DIR, help="History store directory")
+    parser.add_argument("--start", help="First date to test, e.g. 2015-01-01")
+    parser.add_argument("--horizon", type=int, default=20, help="Bars ahead used to score a signal as a hit")
+    parser.add_argument("--cost", type=float, default=0.0005, help="Transaction cost per unit of turnover")
+    parser.add_argument("--allow-short", action="store_true", help="Go short on Sell instead of flat")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+    parser.add_argument("--output", help="Write per-ticker results to this CSV file")
+    parser.add_argument("--backfill", metavar="PERIOD", help="First load this much history from upstream, e.g. 10y or max")
+    args = parser.parse_args(argv)
+    if args.horizon < 1:
+        parser.error("--horizon must be at least 1")
+
+    if args.backfill:
+        tickers = [t.upper() for t in args.tickers] or HistoryStore(args.store).tickers()
+        if not tickers:
+            parser.error("--backfill needs ticker symbols when the store is empty")
+        added = backfill(args.store, tickers, args.backfill)
+        loaded = sum(1 for count in added.values() if count is not None)
+        print(f"Backfilled {args.backfill} for {loaded}/{len(tickers)} tickers", file=sys.stderr)
+
+    results, summary = run_backtest(
+        args.store, args.tickers, args.start, args.horizon, args.cost, args.allow_short, args.workers
+    )
+    if results.empty:
+        print(f"No stored history found in {args.store}", file=sys.stderr)
+        return 1
+    columns = ["bars", "total_return", "buy_and_hold", "max_drawdown", "buy_hit_rate", "sell_hit_rate", "trades"]
+    print(results[columns].sort_values("total_return", ascending=False).round(3).to_string())
+    print()
+    for key, value in summary.items():
+        print(f"{key:24s} {value:,.3f}" if isinstance(value, float) else f"{key:24s} {value:,}")
+    if args.output:
+        results.to_csv(args.output, index_label="ticker")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from agent_pool import get_agent_pool
+from agent_orchestrator import orchestrate_agents
+
+DEFAULT_REQUEST = "Provide a complete stock analysis for {ticker} with a Buy/Sell/Hold recommendation."
+
+def load_portfolio(path):
+    """Read tickers from a text file (one per line) or a CSV with a ticker/symbol column."""
+    with open(path, newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+            if not rows:
+                return []
+            columns = {name.lower(): name for name in rows[0]}
+            column = columns.get("ticker") or columns.get("symbol") or next(iter(rows[0]))
+            tickers = [row[column] for row in rows]
+        else:
+            tickers = [line.split("#")[0] for line in f]
+    return list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+
+def analyze_ticker(ticker, request_template=DEFAULT_REQUEST):
+    with get_agent_pool().lease() as agent_set:
+        return orchestrate_agents(
+            request_template.format(ticker=ticker), *agent_set.members, precompute=True, register=False
+        )
+
+class ResultWriter:
+    """Streams finished batch results to a JSONL file or a directory of Markdown reports."""
+    def __init__(self, path, fmt="jsonl"):
+        self.path = path
+        self.fmt = fmt
+        self._file = None
+        if fmt == "jsonl":
+            self._file = open(path, "a", encoding="utf-8")
+        else:
+            os.makedirs(path, exist_ok=True)
+
+    def write(self, record):
+        if self._file is not None:
+            self._file.write(json.dumps(record, default=str) + "\n")
+            self._file.flush()
+            return
+        with open(os.path.join(self.path, f"{record['ticker']}.md"), "w", encoding="utf-8") as f:
+            f.write(f"# {record['ticker']}\n\n")
+            f.write(f"_Status: {record['status']} | {record['finished_at']} | {record['duration']:.1f}s_\n\n")
+            f.write(record["result"] or "")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+async def run_batch(tickers, request_template=DEFAULT_REQUEST, max_workers=8, timeout=300,
+                    on_result=None, analyze=analyze_ticker):
+    """Analyze ``tickers`` concurrently on a bounded worker pool.
+
+    Every job leases its own agent set from the shared pool. ``timeout`` starts once a job has
+    a worker; a timed-out job is reported immediately but keeps its worker
+    slot until the underlying thread returns, so the pool never exceeds
+    ``max_workers`` threads. ``on_result`` is called as each job finishes.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-analysis")
+    slots = asyncio.Semaphore(max_workers)
+
+    async def run_one(ticker):
+        await slots.acquire()
+        started = time.monotonic()
+        future = loop.run_in_executor(executor, analyze, ticker, request_template)
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), timeout)
+            status = "error" if str(result).startswith("Error during analysis") else "ok"
+        except asyncio.TimeoutError:
+            result, status = f"Analysis timed out after {timeout}s", "timeout"
+        except Exception as e:
+            result, status = f"Error during analysis: {str(e)}", "error"
+        record = {
+            "ticker": ticker,
+            "status": status,
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "duration": time.monotonic() - started,
+            "result": result,
+        }
+        if on_result:
+            on_result(record)
+        return record
+
+    try:
+        tasks = [asyncio.ensure_future(run_one(ticker)) for ticker in tickers]
+        return [await task for task in asyncio.as_completed(tasks)]
+    finally:
+        executor.shutdown(wait=False)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run stock analyses for many tickers concurrently.")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols to analyze")
+    parser.add_argument("--portfolio", help="Text file (one ticker per line) or CSV with a ticker column")
+    parser.add_argument("--workers", type=int, default=8, help="Maximum concurrent analyses")
+    parser.add_argument("--timeout", type=float, default=300, help="Per-job timeout in seconds")
+    parser.add_argument("--format", choices=["jsonl", "markdown"], default="jsonl")
+    parser.add_argument("--output", help="JSONL file or Markdown directory (default: batch_<timestamp>)")
+    parser.add_argument("--request", default=DEFAULT_REQUEST, help="Request template; {ticker} is substituted")
+    args = parser.parse_args(argv)
+
+    tickers = [t.upper() for t in args.tickers]
+    if args.portfolio:
+        tickers += load_portfolio(args.portfolio)
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        parser.error("no tickers given")
+    if not os.environ.get("OPENAI_API_KEY"):
+        parser.error("OPENAI_API_KEY is not set")
+
+    output = args.output or f"batch_{datetime.now().strftime('%Y%m%d_%H%M')}" + (".jsonl" if args.format == "jsonl" else "")
+    writer = ResultWriter(output, args.format)
+    get_agent_pool(max_size=args.workers)
+
+    def report(record):
+        writer.write(record)
+        print(f"[{record['status']}] {record['ticker']} ({record['duration']:.1f}s)", file=sys.stderr)
+
+    try:
+        results = asyncio.run(run_batch(tickers, args.request, args.workers, args.timeout, on_result=report))
+    finally:
+        writer.close()
+    failed = sum(1 for r in results if r["status"] != "ok")
+    print(f"{len(results) - failed}/{len(results)} analyses succeeded -> {output}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+import zlib
+import numpy as np
+import pandas as pd
+from history_store import period_offset
+
+class FakeMarketDataProvider:
+    """Offline stand-in for yfinance serving synthetic or recorded OHLCV and ``info``.
+
+    Synthetic prices are a seeded geometric random walk per ticker, so every
+    run sees the same data. ``recorded`` maps tickers to ``{"history": <frame
+    or records>, "info": {...}}`` loaded from a JSON recording instead.
+    ``latency`` simulates the upstream round-trip per call and ``error_rate``
+    the share of calls rejected as throttled. ``download`` serves several
+    symbols in one call, like ``yf.download``.
+    """
+    def __init__(self, latency=0.0, years=5, recorded=None, error_rate=0.0):
+        self.latency = latency
+        self.years = years
+        self.recorded = recorded or {}
+        self.error_rate = error_rate
+        self.calls = {"history": 0, "download": 0, "info": 0}
+        self._lock = threading.Lock()
+        self._frames = {}
+        self._rng = np.random.default_rng(0)
+
+    @classmethod
+    def from_recording(cls, path, latency=0.0):
+        with open(path) as f:
+            recording = json.load(f)
+        recorded = {}
+        for ticker, entry in recording.items():
+            frame = pd.DataFrame(entry["history"])
+            frame.index = pd.to_datetime(frame.pop("Date"), utc=True)
+            recorded[ticker.upper()] = {"history": frame, "info": entry.get("info", {})}
+        return cls(latency=latency, recorded=recorded)
+
+    def _count(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+            throttled = self.error_rate and self._rng.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if throttled:
+            raise RuntimeError("429 Too Many Requests (simulated)")
+
+    def _frame(self, ticker):
+        if ticker in self.recorded:
+            return self.recorded[ticker]["history"]
+        with self._lock:
+            frame = self._frames.get(ticker)
+        if frame is not None:
+            return frame
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        end = pd.Timestamp.now(tz="America/New_York").normalize()
+        index = pd.bdate_range(end=end, periods=252 * self.years, tz="America/New_York")
+        close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(index)))) + 10
+        spread = np.abs(rng.normal(0, 0.01, len(index))) * close
+        frame = pd.DataFrame({
+            "Open": close + rng.normal(0, 0.3, len(index)),
+            "High": close + spread,
+            "Low": close - spread,
+            "Close": close,
+            "Volume": rng.integers(1_000_000, 50_000_000, len(index)).astype(float),
+        }, index=index)
+        with self._lock:
+            self._frames.setdefault(ticker, frame)
+        return frame
+
+    def history(self, ticker, period=None, interval="1d", start=None):
+        self._count("history")
+        return self._slice(ticker, period, start)
+
+    def download(self, tickers, period=None, start=None, interval="1d"):
+        self._count("download")
+        return {ticker: self._slice(ticker, period, start) for ticker in tickers}
+
+    def _slice(self, ticker, period, start):
+        frame = self._frame(ticker.upper())
+        if start is not None:
+            return frame[frame.index >= pd.Timestamp(start, tz=frame.index.tz)].copy()
+        offset = period_offset(period)
+        if offset is None:
+            return frame.copy()
+        return frame[frame.index >= pd.Timestamp.now(tz=frame.index.tz) - offset].copy()
+
+    def info(self, ticker):
+        self._count("info")
+        ticker = ticker.upper()
+        if ticker in self.recorded:
+            return dict(self.recorded[ticker]["info"])
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()) + 1)
+        close = float(self._frame(ticker)["Close"].iloc[-1])
+        return {
+            "shortName": f"{ticker} Corp",
+            "currentPrice": round(close, 2),
+            "currency": "USD",
+            "longBusinessSummary": f"{ticker} Corp designs, manufactures and sells synthetic products. " * 20,
+            "marketCap": float(rng.uniform(1e9, 3e12)),
+            "trailingPE": float(rng.uniform(8, 60)),
+            "priceToBook": float(rng.uniform(1, 30)),
+            "dividendRate": float(rng.uniform(0, 4)),
+            "dividendYield": float(rng.uniform(0, 0.05)),
+            "beta": float(rng.uniform(0.5, 1.8)),
+            "52WeekChange": float(rng.uniform(-0.4, 0.8)),
+        }
+
+    def infos(self, tickers):
+        return {ticker.upper(): self.info(ticker) for ticker in tickers}
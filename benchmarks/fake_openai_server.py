@@ -0,0 +1,158 @@
+import json
+import math
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TICKER = re.compile(r"\$?\b([A-Z]{2,5})\b")
+
+def _estimate_tokens(text):
+    return math.ceil(len(text) / 4)
+
+def scripted_reply(body):
+    """Default script: call the first offered tool that has no result in the
+    conversation yet, otherwise answer with a short canned analysis."""
+    messages = body.get("messages", [])
+    transcript = "\n".join(str(m.get("content") or "") for m in messages)
+    for tool in body.get("tools") or []:
+        name = tool["function"]["name"]
+        if f'"name":"{name}"' in transcript or f'"name": "{name}"' in transcript:
+            continue
+        tickers = [t for t in _TICKER.findall(transcript) if t not in {"MACD", "RSI", "SMA", "EMA", "USD"}]
+        arguments = json.dumps({"ticker": tickers[0] if tickers else "AAPL"})
+        return {"tool_calls": [{
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": name, "arguments": arguments},
+        }]}
+    return {"content": "Based on the tool results, the trend is neutral. Recommendation: Hold."}
+
+class FakeOpenAIServer:
+    """Local OpenAI-compatible ``/chat/completions`` endpoint for offline runs.
+
+    Replies come from ``script(body) -> {"content": ...} | {"tool_calls": [...]}``
+    after ``latency`` seconds, streamed as SSE when the request asks for it.
+    Call and token counters let benchmarks report LLM usage.
+    """
+    def __init__(self, latency=0.0, script=scripted_reply, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.script = script
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls = self.prompt_tokens = self.completion_tokens = 0
+
+    def counters(self):
+        with self._lock:
+            return {
+                "llm_calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+    def _complete(self, body):
+        if self.latency:
+            time.sleep(self.latency)
+        reply = self.script(body)
+        prompt_tokens = _estimate_tokens(json.dumps(body.get("messages", [])))
+        completion_tokens = _estimate_tokens(json.dumps(reply))
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return reply, usage
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                reply, usage = server._complete(body)
+                base = {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake-model"),
+                }
+                finish_reason = "tool_calls" if reply.get("tool_calls") else "stop"
+                if body.get("stream"):
+                    self._send_stream(base, reply, usage, finish_reason)
+                    return
+                message = {"role": "assistant", "content": reply.get("content")}
+                if reply.get("tool_calls"):
+                    message["tool_calls"] = reply["tool_calls"]
+                self._send_json({
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                    "usage": usage,
+                })
+
+            def _send_json(self, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, base, reply, usage, finish_reason):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                deltas = [{"role": "assistant"}]
+                if reply.get("tool_calls"):
+                    deltas.append({"tool_calls": [dict(call, index=i) for i, call in enumerate(reply["tool_calls"])]})
+                else:
+                    deltas.extend({"content": word} for word in re.findall(r"\S+\s*", reply.get("content") or ""))
+                chunks = [{"index": 0, "delta": delta, "finish_reason": None} for delta in deltas]
+                chunks.append({"index": 0, "delta": {}, "finish_reason": finish_reason})
+                for choice in chunks:
+                    event = {**base, "object": "chat.completion.chunk", "choices": [choice]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                usage_event = {**base, "object": "chat.completion.chunk", "choices": [], "usage": usage}
+                self.wfile.write(f"data: {json.dumps(usage_event)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
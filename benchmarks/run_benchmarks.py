@@ -0,0 +1,221 @@
+"""Offline benchmark suite for the stock analysis pipeline.
+
+Times the cold import of the app, then runs every FinanceTools method,
+orchestrate_agents end to end and a batch run against local stand-ins for
+yfinance and the OpenAI API, and reports p50/p95 latency, throughput, LLM
+calls and tokens. Results can be saved as a baseline and later runs
+compared against it:
+
+    python -m benchmarks.run_benchmarks --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.fake_market_data import FakeMarketDataProvider
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from benchmarks.startup import bench_startup
+
+TOOL_NAMES = ["finance_data_fetch", "technical_analysis_tool", "risk_assessment_tool", "strategy_signal_tool"]
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * q
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def summarize(samples, wall_time, counters=None):
+    result = {
+        "runs": len(samples),
+        "p50_ms": percentile(samples, 0.5) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "throughput_per_s": len(samples) / wall_time if wall_time else 0.0,
+    }
+    if counters:
+        runs = max(len(samples), 1)
+        result.update({f"{key}_per_run": value / runs for key, value in counters.items()})
+    return result
+
+def timed(func, iterations, setup=None):
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    return samples, time.perf_counter() - started
+
+def bench_tools(provider, tickers, iterations, workdir):
+    """Each tool cold (empty cache and a new, empty history store per call) and warm (everything pre-fetched)."""
+    from history_store import HistoryStore
+    from tools import FinanceTools, market_data
+    shared_store = market_data.provider
+    results = {}
+    for cold in (True, False):
+        for name in TOOL_NAMES:
+            tool = getattr(FinanceTools, name)
+            index = iter(range(10 ** 9))
+
+            def fresh_store():
+                market_data.clear()
+                market_data.provider = HistoryStore(tempfile.mkdtemp(dir=workdir), source=provider)
+
+            if not cold:
+                market_data.provider = shared_store
+                for ticker in tickers:
+                    tool(ticker)
+            calls_before = dict(provider.calls)
+
+            def run():
+                tool(tickers[next(index) % len(tickers)])
+
+            samples, wall = timed(run, iterations, setup=fresh_store if cold else None)
+            upstream = sum(provider.calls.values()) - sum(calls_before.values())
+            results[f"tool.{name}.{'cold' if cold else 'warm'}"] = summarize(
+                samples, wall, {"upstream_calls": upstream}
+            )
+    market_data.provider = shared_store
+    return results
+
+def bench_fetch(tickers, latency, error_rate=0.1):
+    """Concurrent single-ticker history requests through the fetch scheduler against a flaky fake upstream."""
+    from fetch_scheduler import FetchScheduler
+    provider = FakeMarketDataProvider(latency=latency, error_rate=error_rate)
+    scheduler = FetchScheduler(backend=provider, rate=20, burst=5, backoff=0.05)
+
+    def fetch(ticker):
+        t0 = time.perf_counter()
+        scheduler.history(ticker, period="6mo")
+        return time.perf_counter() - t0
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(tickers)) as pool:
+        samples = list(pool.map(fetch, tickers))
+    result = summarize(samples, time.perf_counter() - started, {"upstream_calls": provider.calls["download"]})
+    metrics = scheduler.metrics()
+    result.update({key: metrics[key] for key in ("bulk_downloads", "retries", "errors", "throttle_wait_s")})
+    return {f"fetch.bulk_history.{len(tickers)}": result}
+
+ORCHESTRATE_CONFIGS = {
+    "tool_calls": {"precompute": False, "mode": "groupchat"},
+    "precompute": {"precompute": True, "mode": "groupchat"},
+    "workflow": {"precompute": True, "mode": "workflow"},
+}
+
+def bench_orchestrate(server, tickers, iterations):
+    from agent_pool import get_agent_pool
+    from agent_orchestrator import orchestrate_agents
+    from tools import market_data
+    results = {}
+    for name, options in ORCHESTRATE_CONFIGS.items():
+        server.reset_counters()
+        index = iter(range(10 ** 9))
+
+        def run():
+            market_data.clear()
+            ticker = tickers[next(index) % len(tickers)]
+            with get_agent_pool().lease() as agent_set:
+                orchestrate_agents(
+                    f"Should I invest in {ticker} based on recent trends?",
+                    *agent_set.members,
+                    use_cache=False,
+                    register=False,
+                    **options,
+                )
+
+        samples, wall = timed(run, iterations)
+        results[f"orchestrate.{name}"] = summarize(samples, wall, server.counters())
+    return results
+
+def bench_batch(server, tickers, workers):
+    from batch_analysis import run_batch
+    server.reset_counters()
+    samples = []
+    started = time.perf_counter()
+    records = asyncio.run(run_batch(tickers, max_workers=workers, timeout=120, on_result=lambda r: samples.append(r["duration"])))
+    wall = time.perf_counter() - started
+    result = summarize(samples, wall, server.counters())
+    result["failed"] = sum(1 for r in records if r["status"] != "ok")
+    return {f"batch.{len(tickers)}x{workers}": result}
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ("p50_ms", "p95_ms", "llm_calls_per_run", "prompt_tokens_per_run"):
+            if metric in current and metric in previous and previous[metric] > 0:
+                if current[metric] > previous[metric] * (1 + tolerance):
+                    regressions.append(f"{name} {metric}: {previous[metric]:.1f} -> {current[metric]:.1f}")
+    return regressions
+
+def run(args, tickers, workdir):
+    """Run every benchmark with all on-disk state under ``workdir``."""
+    os.environ["STOCK_HISTORY_DIR"] = os.path.join(workdir, "history")
+    os.environ["LLM_CACHE_DISABLED"] = "1"
+    os.environ["LLM_STREAM"] = "0"
+
+    from history_store import HistoryStore
+    from tools import market_data
+    provider = FakeMarketDataProvider(latency=args.data_latency)
+    market_data.provider = HistoryStore(os.environ["STOCK_HISTORY_DIR"], source=provider)
+
+    results = bench_startup()
+    results.update(bench_fetch(tickers * 4, args.data_latency))
+    results.update(bench_tools(provider, tickers, args.iterations, workdir))
+    if not args.skip_agents:
+        with FakeOpenAIServer(latency=args.llm_latency) as server:
+            os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+            os.environ["OPENAI_BASE_URL"] = server.base_url
+            results.update(bench_orchestrate(server, tickers, max(args.iterations // 4, 2)))
+            results.update(bench_batch(server, tickers, args.workers))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", default="AAPL,MSFT,NVDA,GOOG,AMZN,META,TSLA,JPM")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--data-latency", type=float, default=0.05, help="Simulated upstream latency (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Simulated model latency (s)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-agents", action="store_true", help="Only benchmark the FinanceTools methods")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--save-baseline", help="Save results as the baseline at this path")
+    parser.add_argument("--compare", help="Compare against the baseline at this path")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging a regression")
+    args = parser.parse_args(argv)
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+
+    # Open memmaps and SQLite files can keep the directory busy on Windows.
+    with tempfile.TemporaryDirectory(prefix="stock-bench-", ignore_cleanup_errors=True) as workdir:
+        results = run(args, tickers, workdir)
+
+    for name, metrics in results.items():
+        line = ", ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}" for key, value in metrics.items())
+        print(f"{name:45s} {line}")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Cold-start benchmark: import time of the Streamlit entry point and its first paint.
+
+Each sample imports ``app`` in a fresh interpreter. The run fails if the
+median exceeds the budget, or if a heavy dependency is loaded before the
+first analysis needs it:
+
+    python -m benchmarks.startup --budget-ms 800
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["autogen", "openai", "yfinance", "pandas", "numpy", "tiktoken"]
+DEFAULT_BUDGET_MS = 800
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+_FIRST_PAINT = """
+import json, time
+from streamlit.testing.v1 import AppTest
+started = time.perf_counter()
+AppTest.from_file("app.py", default_timeout=60).run()
+print(json.dumps({"ms": (time.perf_counter() - started) * 1000}))
+"""
+
+def _run_probe(code):
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def bench_startup(runs=5, module="app", first_paint=False):
+    """Median/max import time of ``module`` over ``runs`` fresh interpreters, plus heavy modules it loaded."""
+    samples, loaded = [], set()
+    for _ in range(runs):
+        probe = _run_probe(_PROBE.format(module=module, heavy=HEAVY_MODULES))
+        samples.append(probe["ms"])
+        loaded.update(probe["loaded"])
+    result = {
+        f"startup.import_{module}": {
+            "runs": runs,
+            "p50_ms": statistics.median(samples),
+            "p95_ms": max(samples),
+            "heavy_modules": sorted(loaded),
+        }
+    }
+    if first_paint:
+        paints = [_run_probe(_FIRST_PAINT)["ms"] for _ in range(runs)]
+        result["startup.first_paint"] = {"runs": runs, "p50_ms": statistics.median(paints), "p95_ms": max(paints)}
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Allowed median import time")
+    parser.add_argument("--first-paint", action="store_true", help="Also time a full first script run (needs streamlit)")
+    args = parser.parse_args(argv)
+
+    results = bench_startup(args.runs, args.module, args.first_paint)
+    for name, metrics in results.items():
+        line = ", ".join(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}" for key, value in metrics.items())
+        print(f"{name:45s} {line}")
+
+    failures = []
+    imported = results[f"startup.import_{args.module}"]
+    if imported["p50_ms"] > args.budget_ms:
+        failures.append(f"import {args.module} took {imported['p50_ms']:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    if imported["heavy_modules"]:
+        failures.append(f"import {args.module} loaded {', '.join(imported['heavy_modules'])} eagerly")
+    for failure in failures:
+        print(f"OVER BUDGET {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import pandas as pd
+from tracing import tracer
+
+def pooled_session():
+    """One HTTP session for every upstream call, so connections are reused."""
+    try:
+        from curl_cffi import requests as curl_requests
+        return curl_requests.Session(impersonate="chrome")
+    except ImportError:
+        import requests
+        return requests.Session()
+
+class YFinanceBackend:
+    """yfinance calls over a shared session; ``download`` fetches many symbols in one request."""
+    def __init__(self, session=None):
+        self._session = session
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = pooled_session()
+            return self._session
+
+    def download(self, tickers, period=None, start=None, interval="1d"):
+        import yfinance as yf
+        data = yf.download(
+            tickers,
+            period=None if start is not None else period,
+            start=start,
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=True,
+            ignore_tz=False,
+            threads=False,
+            progress=False,
+            session=self.session,
+        )
+        symbols = set(data.columns.get_level_values(0)) if isinstance(data.columns, pd.MultiIndex) else set()
+        return {ticker: data[ticker].dropna(how="all") for ticker in tickers if ticker in symbols}
+
+    def info(self, ticker):
+        import yfinance as yf
+        return yf.Ticker(ticker, session=self.session).info
+
+class TokenBucket:
+    """Allows ``rate`` acquisitions per second on average, with bursts of up to ``burst``.
+
+    Priority callers reserve the next token even when the bucket is empty, so
+    they are served in arrival order. Other callers only take a token that is
+    already available and keep waiting while any are reserved, which puts them
+    behind every priority caller.
+    """
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=True):
+        """Take one token, sleeping until one is available; returns the seconds waited."""
+        if priority:
+            with self._lock:
+                self._refill()
+                self._tokens -= 1
+                wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if wait:
+                time.sleep(wait)
+            return wait
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+class FetchScheduler:
+    """Rate-limited, batching front for upstream market data.
+
+    Exposes the ``history``/``info``/``infos`` provider interface, so it can
+    be the ``HistoryStore`` source. Every upstream call takes a token from a
+    shared bucket (``rate`` per second) and is retried up to ``max_retries``
+    times with full-jitter exponential backoff. Single-ticker history
+    requests that arrive within ``batch_window`` seconds and ask for the
+    same window are grouped into one multi-symbol ``download`` of at most
+    ``max_batch`` tickers. Duplicate requests for a ticker share its result.
+    Bulk ``infos`` lookups (watchlists, screens) run on their own workers at
+    low priority, so they never hold up history or single ``info`` fetches.
+    """
+    def __init__(self, backend=None, rate=2.0, burst=4, max_batch=20, batch_window=0.05,
+                 max_retries=3, backoff=0.5, max_concurrency=4, info_concurrency=2):
+        self.backend = backend or YFinanceBackend()
+        self.bucket = TokenBucket(rate, burst)
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._pending = OrderedDict()
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="fetch")
+        self._info_executor = ThreadPoolExecutor(max_workers=info_concurrency, thread_name_prefix="fetch-info")
+        self._dispatcher = None
+        self._stats = {
+            "requests": 0,
+            "bulk_downloads": 0,
+            "batched_tickers": 0,
+            "coalesced": 0,
+            "in_flight": 0,
+            "throttled": 0,
+            "throttle_wait_s": 0.0,
+            "retries": 0,
+            "errors": 0,
+        }
+
+    def _count(self, **increments):
+        with self._cond:
+            for key, amount in increments.items():
+                self._stats[key] += amount
+
+    def _call(self, func, priority=True):
+        for attempt in range(self.max_retries + 1):
+            waited = self.bucket.acquire(priority)
+            self._count(requests=1, throttled=int(waited > 0), throttle_wait_s=waited)
+            try:
+                return func()
+            except Exception:
+                if attempt == self.max_retries:
+                    self._count(errors=1)
+                    raise
+                self._count(retries=1)
+                time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    def history(self, ticker, period=None, interval="1d", start=None):
+        ticker = ticker.upper()
+        with tracer.span("fetch.history", ticker=ticker, period=str(start or period)) as span:
+            data = self._enqueue((period if start is None else None, start, interval), ticker).result()
+            span.attributes["bytes"] = int(data.memory_usage(index=True).sum())
+            return data
+
+    def _enqueue(self, key, ticker):
+        future = Future()
+        with self._cond:
+            waiters = self._pending.setdefault(key, OrderedDict())
+            if ticker in waiters:
+                self._stats["coalesced"] += 1
+            waiters.setdefault(ticker, []).append(future)
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name="fetch-dispatcher", daemon=True)
+                self._dispatcher.start()
+            self._cond.notify()
+        return future
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            time.sleep(self.batch_window)
+            with self._cond:
+                pending, self._pending = self._pending, OrderedDict()
+            for key, waiters in pending.items():
+                tickers = list(waiters)
+                for i in range(0, len(tickers), self.max_batch):
+                    batch = {ticker: waiters[ticker] for ticker in tickers[i:i + self.max_batch]}
+                    self._count(in_flight=1)
+                    self._executor.submit(self._download, key, batch)
+
+    def _download(self, key, batch):
+        period, start, interval = key
+        try:
+            frames = self._call(lambda: self.backend.download(list(batch), period=period, start=start, interval=interval))
+            self._count(bulk_downloads=1, batched_tickers=len(batch))
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+        finally:
+            self._count(in_flight=-1)
+        for ticker, futures in batch.items():
+            frame = frames.get(ticker)
+            if frame is None:
+                frame = pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+            for future in futures:
+                future.set_result(frame.copy())
+
+    def info(self, ticker):
+        with tracer.span("fetch.info", ticker=ticker):
+            return self._call(lambda: self.backend.info(ticker))
+
+    def infos(self, tickers):
+        """``{ticker: info}``; a ticker whose fetch fails maps to None without failing the others."""
+        def fetch(ticker):
+            try:
+                return self._call(lambda: self.backend.info(ticker), priority=False)
+            except Exception:
+                return None
+
+        with tracer.span("fetch.infos", tickers=len(tickers)):
+            return dict(zip(tickers, self._info_executor.map(fetch, tickers)))
+
+    def metrics(self):
+        with self._cond:
+            metrics = dict(self._stats)
+            metrics["queue_depth"] = sum(len(waiters) for waiters in self._pending.values())
+        return metrics
@@ -0,0 +1,225 @@
+import json
+import os
+import re
+import threading
+import time
+import numpy as np
+import pandas as pd
+from tracing import tracer
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+RECORD_DTYPE = np.dtype([("ts", "<i8")] + [(column, "<f8") for column in OHLCV_COLUMNS])
+
+_PERIOD_PATTERN = re.compile(r"^(\d+)(d|mo|y)$")
+# Exchange symbols such as BRK-B, BRK.B, ^GSPC or EURUSD=X; never path separators.
+TICKER_PATTERN = re.compile(r"^[A-Z0-9^][A-Z0-9.\-^=]{0,14}$")
+
+def validate_ticker(ticker):
+    """Return ``ticker`` upper-cased, or raise ``ValueError`` if it is not a plausible symbol."""
+    symbol = str(ticker).strip().upper()
+    if not TICKER_PATTERN.match(symbol):
+        raise ValueError(f"Invalid ticker symbol: {ticker!r}")
+    return symbol
+
+def period_offset(period):
+    match = _PERIOD_PATTERN.match(period or "")
+    if not match:
+        return None
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        return pd.DateOffset(days=count)
+    if unit == "mo":
+        return pd.DateOffset(months=count)
+    return pd.DateOffset(years=count)
+
+class HistoryStore:
+    """Persistent daily OHLCV store with incremental bar append.
+
+    Each ticker is kept as a flat file of fixed-size records (``RECORD_DTYPE``)
+    that is appended to in place and read back through ``np.memmap``, so
+    ``read`` returns zero-copy slices and only bars newer than the last stored
+    one are ever fetched from ``source``. ``frame``/``history`` copy the
+    requested slice into a DataFrame. The store exposes the same ``history``/``info``
+    interface as the upstream provider so it can sit in front of it.
+    """
+    def __init__(self, root, source=None, backfill_period="2y", refresh_interval=60):
+        self.root = root
+        self.source = source
+        self.backfill_period = backfill_period
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._ticker_locks = {}
+        self._refreshed = {}
+
+    def _ticker_lock(self, ticker):
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.RLock())
+
+    def _path(self, ticker, suffix):
+        path = os.path.join(self.root, f"{validate_ticker(ticker)}{suffix}")
+        root = os.path.realpath(self.root)
+        if os.path.dirname(os.path.realpath(path)) != root:
+            raise ValueError(f"Ticker {ticker!r} resolves outside the history store")
+        return path
+
+    def _data_path(self, ticker):
+        return self._path(ticker, ".bin")
+
+    def _meta_path(self, ticker):
+        return self._path(ticker, ".json")
+
+    def _read_meta(self, ticker):
+        try:
+            with open(self._meta_path(ticker)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, ticker, meta):
+        tmp_path = self._meta_path(ticker) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(ticker))
+
+    @staticmethod
+    def _to_records(frame):
+        index = pd.DatetimeIndex(frame.index)
+        if index.tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        records = np.empty(len(frame), dtype=RECORD_DTYPE)
+        records["ts"] = index.to_numpy(dtype="datetime64[ns]").view("i8")
+        for column in OHLCV_COLUMNS:
+            records[column] = frame[column].to_numpy(dtype="f8")
+        return records[np.argsort(records["ts"], kind="stable")]
+
+    def read(self, ticker, start=None):
+        """Return the stored bars for ``ticker`` as a zero-copy memmap slice."""
+        path = self._data_path(validate_ticker(ticker))
+        if not os.path.exists(path) or os.path.getsize(path) < RECORD_DTYPE.itemsize:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        records = np.memmap(path, dtype=RECORD_DTYPE, mode="r")
+        if start is not None:
+            records = records[np.searchsorted(records["ts"], pd.Timestamp(start).value):]
+        return records
+
+    def frame(self, ticker, start=None):
+        """The stored bars from ``start`` as a new DataFrame (only that slice is copied)."""
+        ticker = validate_ticker(ticker)
+        records = self.read(ticker, start=start)
+        index = pd.to_datetime(records["ts"], utc=True)
+        tz = self._read_meta(ticker).get("tz")
+        if tz:
+            index = index.tz_convert(tz)
+        return pd.DataFrame({column: records[column] for column in OHLCV_COLUMNS}, index=index)
+
+    def tickers(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name[:-len(".bin")] for name in os.listdir(self.root) if name.endswith(".bin"))
+
+    def last_timestamp(self, ticker):
+        records = self.read(ticker)
+        return pd.Timestamp(int(records["ts"][-1]), tz="UTC") if len(records) else None
+
+    def append(self, ticker, frame):
+        """Append bars newer than the last stored one; a bar with the same
+        timestamp as the last stored bar replaces it (the live session bar)."""
+        ticker = validate_ticker(ticker)
+        if frame is None or frame.empty:
+            return 0
+        incoming = self._to_records(frame)
+        with self._ticker_lock(ticker):
+            os.makedirs(self.root, exist_ok=True)
+            path = self._data_path(ticker)
+            stored = self.read(ticker)
+            count = len(stored)
+            last_ts = int(stored["ts"][-1]) if count else None
+            del stored
+            if last_ts is not None:
+                incoming = incoming[incoming["ts"] >= last_ts]
+                if not len(incoming):
+                    return 0
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                offset = count
+                if last_ts is not None and incoming["ts"][0] == last_ts:
+                    offset -= 1
+                f.seek(offset * RECORD_DTYPE.itemsize)
+                f.write(incoming.tobytes())
+                f.truncate()
+            meta = self._read_meta(ticker)
+            if "tz" not in meta and getattr(frame.index, "tz", None) is not None:
+                meta["tz"] = str(frame.index.tz)
+                self._write_meta(ticker, meta)
+            return len(incoming)
+
+    def rewrite(self, ticker, frame, coverage=None):
+        ticker = validate_ticker(ticker)
+        with self._ticker_lock(ticker):
+            os.makedirs(self.root, exist_ok=True)
+            path = self._data_path(ticker)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(self._to_records(frame).tobytes())
+            os.replace(tmp_path, path)
+            meta = {"coverage": coverage}
+            if getattr(frame.index, "tz", None) is not None:
+                meta["tz"] = str(frame.index.tz)
+            self._write_meta(ticker, meta)
+
+    def update(self, ticker, period=None):
+        """Bring ``ticker`` up to date from ``source`` and return bars added."""
+        ticker = validate_ticker(ticker)
+        if self.source is None:
+            return 0
+        period = period or self.backfill_period
+        with self._ticker_lock(ticker), tracer.span("history_store.update", ticker=ticker) as span:
+            meta = self._read_meta(ticker)
+            last_ts = self.last_timestamp(ticker)
+            if last_ts is None or _covers(meta.get("coverage"), period) is False:
+                frame = self.source.history(ticker, period=period, interval="1d")
+                self.rewrite(ticker, frame, coverage=period)
+                added = len(frame)
+            else:
+                tz = meta.get("tz") or "UTC"
+                start = last_ts.tz_convert(tz).date()
+                added = self.append(ticker, self.source.history(ticker, start=start, interval="1d"))
+            self._refreshed[ticker] = time.monotonic()
+            span.attributes["bars_added"] = added
+            return added
+
+    def history(self, ticker, period="6mo", interval="1d", start=None):
+        ticker = validate_ticker(ticker)
+        offset = period_offset(period)
+        if interval != "1d" or (offset is None and period != "max" and start is None):
+            return self.source.history(ticker, period=period, interval=interval, start=start)
+        with self._ticker_lock(ticker):
+            refreshed = self._refreshed.get(ticker)
+            if refreshed is None or time.monotonic() - refreshed > self.refresh_interval:
+                self.update(ticker, period=_widest(self.backfill_period, period))
+            elif _covers(self._read_meta(ticker).get("coverage"), period) is False:
+                self.update(ticker, period=period)
+            if start is None and offset is not None:
+                start = pd.Timestamp.now(tz="UTC") - offset
+            return self.frame(ticker, start=start)
+
+    def info(self, ticker):
+        return self.source.info(ticker)
+
+    def infos(self, tickers):
+        if hasattr(self.source, "infos"):
+            return self.source.infos(tickers)
+        return {ticker: self.source.info(ticker) for ticker in tickers}
+
+def _covers(coverage, period):
+    if coverage == "max":
+        return True
+    if period == "max":
+        return False
+    covered, requested = period_offset(coverage), period_offset(period)
+    if covered is None or requested is None:
+        return None
+    now = pd.Timestamp.now()
+    return now - covered <= now - requested
+
+def _widest(first, second):
+    return second if _covers(first, second) is False else first
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_COLUMNS = ["SMA_20", "EMA_20", "RSI", "MACD", "MACD_Signal", "Last_Close"]
+
+# Recommendation thresholds from the strategy_agent system prompt.
+RSI_OVERBOUGHT = 70
+RSI_NEUTRAL_BAND = 5
+RSI_WINDOW = 14
+
+def sma(prices, window=20):
+    return prices.rolling(window=window).mean()
+
+def ema(prices, span=20):
+    return prices.ewm(span=span, adjust=False).mean()
+
+def rsi(prices, window=14, wilder=False):
+    delta = prices.diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    if wilder:
+        avg_gain = gain.ewm(alpha=1 / window, adjust=False).mean()
+        avg_loss = loss.ewm(alpha=1 / window, adjust=False).mean()
+    else:
+        avg_gain = gain.rolling(window=window).mean()
+        avg_loss = loss.rolling(window=window).mean()
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+def macd(prices, fast=12, slow=26, signal=9):
+    line = ema(prices, span=fast) - ema(prices, span=slow)
+    return line, line.ewm(span=signal, adjust=False).mean()
+
+def compute_indicators(prices):
+    """Compute every indicator over a dates x tickers close matrix in one pass.
+
+    ``prices`` may be a DataFrame (one column per ticker) or a single Series;
+    each result has the same shape as the input.
+    """
+    macd_line, signal_line = macd(prices)
+    return {
+        "SMA_20": sma(prices, window=20),
+        "EMA_20": ema(prices, span=20),
+        "RSI": rsi(prices, window=RSI_WINDOW),
+        "MACD": macd_line,
+        "MACD_Signal": signal_line,
+    }
+
+def snapshot(prices):
+    """Latest value of each indicator per ticker, as a tickers x indicators frame.
+
+    Each ticker is computed over its own bars only: dates missing from its
+    column (a gap, or another exchange's calendar in the outer-joined close
+    matrix) are skipped, not bridged, so the last row is always that ticker's
+    own latest bar. Indicators without enough history come back as NaN.
+    """
+    if isinstance(prices, pd.Series):
+        prices = prices.to_frame(prices.name or "value")
+    values = prices.to_numpy(dtype="float64")
+    # Move every column's bars to the bottom, keeping their order, so the
+    # whole matrix is still computed in one pass.
+    order = np.argsort(~np.isnan(values), axis=0, kind="stable")
+    packed = pd.DataFrame(np.take_along_axis(values, order, axis=0), columns=prices.columns)
+    latest = {name: frame.iloc[-1] for name, frame in compute_indicators(packed).items()}
+    # RSI's diff turns the leading padding into flat bars; short histories
+    # must stay NaN as they would on their own.
+    latest["RSI"] = latest["RSI"].where(packed.notna().sum() >= RSI_WINDOW)
+    latest["Last_Close"] = packed.iloc[-1]
+    return pd.DataFrame(latest)[SNAPSHOT_COLUMNS]
+
+def strategy_signal(macd_line, signal_line, rsi_values):
+    """Buy/Sell/Hold per the strategy_agent rules, element-wise over aligned inputs.
+
+    RSI near 50 means Hold; otherwise MACD above its signal with RSI below 70
+    means Buy, and MACD below its signal or RSI above 70 means Sell. A missing
+    (NaN) input means Hold.
+    """
+    unknown = np.isnan(macd_line) | np.isnan(signal_line) | np.isnan(rsi_values)
+    bullish = macd_line > signal_line
+    neutral = (rsi_values - 50).abs() <= RSI_NEUTRAL_BAND
+    return np.select(
+        [unknown, neutral, bullish & (rsi_values < RSI_OVERBOUGHT), ~bullish | (rsi_values > RSI_OVERBOUGHT)],
+        ["Hold", "Hold", "Buy", "Sell"],
+        default="Hold",
+    )
@@ -0,0 +1,318 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from result_store import get_result_store
+
+PENDING_STATUSES = ("queued", "running")
+# How often a queue marks the jobs it dispatched as still owned, and how long
+# without a mark before another queue may take them over.
+HEARTBEAT_INTERVAL = 10
+HEARTBEAT_STALE = 3 * HEARTBEAT_INTERVAL
+
+class JobStore:
+    """Durable job table in SQLite, shared by the web process and the workers.
+
+    ``owners`` lists the result-store owners of every caller that submitted
+    or joined the job; the worker files the report under each of them.
+    Each pending job records which queue dispatched it (``claimed_by``) and
+    when that queue last confirmed it is alive (``heartbeat``). Jobs pending
+    for longer than ``timeout`` seconds are failed, so a hung job stops
+    collecting identical requests.
+    """
+    def __init__(self, path, timeout=None):
+        self.path = path
+        self.timeout = timeout
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, dedup_key TEXT NOT NULL, request TEXT NOT NULL, options TEXT NOT NULL, "
+            "status TEXT NOT NULL, progress REAL NOT NULL DEFAULT 0, message TEXT, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, claimed_by TEXT, heartbeat REAL, "
+            "owners TEXT NOT NULL DEFAULT '[]')"
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("claimed_by", "TEXT"), ("heartbeat", "REAL"), ("owners", "TEXT NOT NULL DEFAULT '[]'")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, status)")
+        self._conn.commit()
+
+    def create_or_get(self, dedup_key, request, options, claimed_by=None, owner=None):
+        """Insert a queued job unless an identical one is still pending; returns (job_id, created).
+
+        ``owner`` is added to the job's owners either way.
+        """
+        self.expire()
+        now = time.time()
+        owners = [owner] if owner is not None else []
+        with self._lock:
+            placeholders = ",".join("?" for _ in PENDING_STATUSES)
+            row = self._conn.execute(
+                f"SELECT id, owners FROM jobs WHERE dedup_key = ? AND status IN ({placeholders}) "
+                "ORDER BY created_at LIMIT 1",
+                (dedup_key, *PENDING_STATUSES),
+            ).fetchone()
+            if row is not None:
+                joined = json.loads(row["owners"])
+                if owner is not None and owner not in joined:
+                    self._conn.execute(
+                        "UPDATE jobs SET owners = ? WHERE id = ?", (json.dumps(joined + owners), row["id"])
+                    )
+                    self._conn.commit()
+                return row["id"], False
+            job_id = uuid.uuid4().hex
+            self._conn.execute(
+                "INSERT INTO jobs (id, dedup_key, request, options, status, created_at, updated_at, claimed_by, "
+                "heartbeat, owners) VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, dedup_key, request, json.dumps(options), now, now, claimed_by, now, json.dumps(owners)),
+            )
+            self._conn.commit()
+            return job_id, True
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id):
+        self.expire()
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["options"] = json.loads(job["options"])
+        job["owners"] = json.loads(job["owners"])
+        return job
+
+    def expire(self):
+        """Fail every job that has been pending for longer than ``timeout``."""
+        if not self.timeout:
+            return
+        placeholders = ",".join("?" for _ in PENDING_STATUSES)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET status = 'failed', error = ?, message = NULL, updated_at = ? "
+                f"WHERE status IN ({placeholders}) AND created_at < ?",
+                (f"Timed out after {self.timeout:.0f}s", now, *PENDING_STATUSES, now - self.timeout),
+            )
+            self._conn.commit()
+
+    def heartbeat(self, claimed_by):
+        """Mark the pending jobs dispatched by ``claimed_by`` as still owned."""
+        placeholders = ",".join("?" for _ in PENDING_STATUSES)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET heartbeat = ? WHERE claimed_by = ? AND status IN ({placeholders})",
+                (time.time(), claimed_by, *PENDING_STATUSES),
+            )
+            self._conn.commit()
+
+    def claim_orphans(self, claimed_by, stale_after=HEARTBEAT_STALE):
+        """Take over pending jobs whose queue stopped heartbeating; returns (id, request, options) per job.
+
+        Each job is claimed with a conditional update, so when several
+        processes start together every orphan goes to exactly one of them.
+        """
+        self.expire()
+        placeholders = ",".join("?" for _ in PENDING_STATUSES)
+        now = time.time()
+        claimed = []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, request, options FROM jobs WHERE status IN ({placeholders}) "
+                "AND (heartbeat IS NULL OR heartbeat < ?) ORDER BY created_at",
+                (*PENDING_STATUSES, now - stale_after),
+            ).fetchall()
+            for row in rows:
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET claimed_by = ?, heartbeat = ? WHERE id = ? AND (heartbeat IS NULL OR heartbeat < ?)",
+                    (claimed_by, now, row["id"], now - stale_after),
+                )
+                if cursor.rowcount:
+                    claimed.append((row["id"], row["request"], json.loads(row["options"])))
+            self._conn.commit()
+        return claimed
+
+    def purge(self, older_than):
+        placeholders = ",".join("?" for _ in PENDING_STATUSES)
+        with self._lock:
+            self._conn.execute(
+                f"DELETE FROM jobs WHERE status NOT IN ({placeholders}) AND updated_at < ?",
+                (*PENDING_STATUSES, time.time() - older_than),
+            )
+            self._conn.commit()
+
+def dedup_key(request, options):
+    normalized = " ".join(request.split()).lower()
+    return hashlib.sha256(json.dumps({"request": normalized, **options}, sort_keys=True).encode()).hexdigest()
+
+def _run_job(db_path, job_id, request, options, env):
+    # Runs in a worker process: the agent pool and market-data caches are per process.
+    os.environ.update(env)
+    from agent_pool import get_agent_pool
+    from agent_orchestrator import orchestrate_agents
+
+    store = JobStore(db_path)
+    store.update(job_id, status="running", progress=0.0, message="Starting agents")
+    expected_events = 7 if options.get("precompute") else 9
+    seen = [0]
+
+    def on_message(event):
+        seen[0] += 1
+        store.update(
+            job_id,
+            progress=min(seen[0] / expected_events, 0.95),
+            message=f"{event['agent']}: {event['kind'].replace('_', ' ')}",
+        )
+
+    try:
+        with get_agent_pool().lease() as agent_set:
+            result = orchestrate_agents(request, *agent_set.members, register=False, on_message=on_message, **options)
+    except Exception as e:
+        store.update(job_id, status="failed", error=str(e), message=None)
+        return
+    if str(result).startswith("Error during analysis"):
+        store.update(job_id, status="failed", error=result, message=None)
+        return
+    # Filed from here so the report is kept even if no submitter is still
+    # polling; owners who join while the job finishes are filed right after.
+    saved = set()
+
+    def save_for_owners():
+        for owner in store.get(job_id)["owners"] or [None]:
+            if owner not in saved:
+                get_result_store().save(request, result, owner=owner)
+                saved.add(owner)
+
+    save_for_owners()
+    store.update(job_id, status="done", progress=1.0, result=result, message=None)
+    save_for_owners()
+
+class JobQueue:
+    """Runs analyses as background jobs on a worker process pool.
+
+    Jobs are recorded in a durable SQLite table (ID, status, progress and
+    result) that callers poll instead of blocking. Submitting a request that
+    matches a job still queued or running returns that job's ID, so identical
+    requests share one execution. Every queue heartbeats the jobs it
+    dispatched; jobs whose queue has gone (a previous process, or another
+    worker that died) are taken over and resubmitted, while jobs another live
+    process is running are left alone. Jobs pending longer than ``timeout``
+    are failed.
+    """
+    def __init__(self, db_path, max_workers=2, retention=7 * 86400, timeout=1800):
+        self.store = JobStore(db_path, timeout=timeout)
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.claim_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._executor = self._new_executor()
+        self.store.purge(retention)
+        self._reclaim()
+        self._stopped = threading.Event()
+        threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True).start()
+
+    def _reclaim(self):
+        for job_id, request, options in self.store.claim_orphans(self.claim_id):
+            self._dispatch(job_id, request, options)
+
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(HEARTBEAT_INTERVAL):
+            try:
+                self.store.heartbeat(self.claim_id)
+                self._reclaim()
+            except sqlite3.Error:
+                pass
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _replace_broken(self, executor):
+        # A worker that dies (OOM, segfault) leaves the whole pool unusable; swap in a new one once.
+        with self._lock:
+            if self._executor is executor:
+                self._executor = self._new_executor()
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def _dispatch(self, job_id, request, options):
+        env = {key: os.environ[key] for key in ("OPENAI_API_KEY", "OPENAI_BASE_URL") if os.environ.get(key)}
+        self.store.update(job_id, status="queued", progress=0.0)
+        for attempt in range(2):
+            with self._lock:
+                executor = self._executor
+            try:
+                future = executor.submit(_run_job, self.db_path, job_id, request, options, env)
+                break
+            except BrokenProcessPool as e:
+                self.store.update(job_id, status="failed", error=f"Worker pool broken: {e}", message=None)
+                if attempt:
+                    return
+                self._replace_broken(executor)
+                self.store.update(job_id, status="queued", error=None)
+        future.add_done_callback(lambda f: self._on_done(job_id, executor, f))
+
+    def _on_done(self, job_id, executor, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self.store.update(job_id, status="failed", error=f"Worker crashed: {error}", message=None)
+            if isinstance(error, BrokenProcessPool):
+                self._replace_broken(executor)
+
+    def submit(self, request, owner=None, **options):
+        """Queue ``request`` (or join the identical pending job) and return the job ID.
+
+        The finished report is saved to the result store under ``owner``.
+        """
+        job_id, created = self.store.create_or_get(
+            dedup_key(request, options), request, options, claimed_by=self.claim_id, owner=owner
+        )
+        if created:
+            self._dispatch(job_id, request, options)
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def close(self):
+        self._stopped.set()
+        with self._lock:
+            executor = self._executor
+        executor.shutdown(wait=True, cancel_futures=True)
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Process-wide job queue (JOB_DB_PATH, JOB_WORKERS and JOB_TIMEOUT configure it)."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(
+                os.environ.get(
+                    "JOB_DB_PATH",
+                    os.path.join(os.path.expanduser("~"), ".cache", "stock_analysis", "jobs.sqlite"),
+                ),
+                max_workers=int(os.environ.get("JOB_WORKERS", 2)),
+                timeout=float(os.environ.get("JOB_TIMEOUT", 1800)),
+            )
+        return _queue
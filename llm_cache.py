@@ -0,0 +1,121 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from tracing import tracer
+
+class SQLiteLLMCache:
+    """Disk-backed LLM response cache with TTL and size-based LRU eviction.
+
+    Implements AutoGen's cache protocol (``get``/``set``/``close`` and the
+    context-manager methods), so it can be passed as ``cache=`` to
+    ``initiate_chat``. AutoGen builds the key from the full request: model,
+    messages and tool schemas. Tool results are part of the messages, so two
+    requests only share an entry when the tool outputs match too.
+    """
+    def __init__(self, path, ttl=86400, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def _hash(key):
+        return hashlib.sha256(str(key).encode("utf-8")).hexdigest()
+
+    def get(self, key, default=None):
+        digest = self._hash(key)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (digest,)
+            ).fetchone()
+            if row is None or row[1] + self.ttl < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (digest,))
+                    self._conn.commit()
+                self.misses += 1
+                return default
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, digest))
+            self._conn.commit()
+            self.hits += 1
+        tracer.increment("cache_hits")
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        blob = pickle.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (self._hash(key), blob, len(blob), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        expired = self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)).rowcount
+        self.evictions += max(expired, 0)
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": total,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        # The cache is shared by every chat in the process, so leaving a chat
+        # must not close the connection; use ``shutdown`` for that.
+        pass
+
+    def shutdown(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
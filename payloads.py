@@ -0,0 +1,109 @@
+import functools
+import json
+import math
+
+DEFAULT_TOKEN_BUDGETS = {
+    "finance_data_fetch": 300,
+    "technical_analysis_tool": 80,
+    "risk_assessment_tool": 80,
+    "strategy_signal_tool": 80,
+}
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    # Loaded on first use: importing tiktoken and its BPE ranks is slow and may hit the network.
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+def estimate_tokens(text):
+    """Token count for ``text``; exact with tiktoken installed, ~4 chars/token otherwise."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+def round_value(value, digits=6):
+    """Recursively round floats to ``digits`` significant digits; NaN/inf become None."""
+    if isinstance(value, dict):
+        return {key: round_value(item, digits) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [round_value(item, digits) for item in value]
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            return None
+        return float(f"{value:.{digits}g}")
+    return value
+
+def truncate_text(text, max_chars):
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut.rstrip(",;:") + "…"
+
+def summarize_closes(close, last_n=5):
+    """Compact view of a close-price series instead of the full date-keyed history."""
+    close = close.dropna()
+    if close.empty:
+        return {}
+    return {
+        "start": close.index[0].strftime("%Y-%m-%d"),
+        "end": close.index[-1].strftime("%Y-%m-%d"),
+        "bars": len(close),
+        "lastCloses": close.iloc[-last_n:].round(2).tolist(),
+        "return1dPct": round((close.iloc[-1] / close.iloc[-2] - 1) * 100, 2) if len(close) > 1 else None,
+        "returnPeriodPct": round((close.iloc[-1] / close.iloc[0] - 1) * 100, 2),
+        "min": round(close.min(), 2),
+        "max": round(close.max(), 2),
+    }
+
+class PayloadEncoder:
+    """Encodes FinanceTools results as compact JSON within a per-tool token budget.
+
+    Numbers are rounded, long strings truncated and, if the payload is still
+    over budget, the longest text and close lists are trimmed further. The
+    encoded payload reports its own size under ``tokens``.
+    """
+    def __init__(self, budgets=None, digits=6, max_text_chars=400):
+        self.budgets = {**DEFAULT_TOKEN_BUDGETS, **(budgets or {})}
+        self.digits = digits
+        self.max_text_chars = max_text_chars
+
+    @staticmethod
+    def _dumps(payload):
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+    def _prepare(self, value):
+        if isinstance(value, dict):
+            return {key: self._prepare(item) for key, item in value.items()}
+        if isinstance(value, str):
+            return truncate_text(value, self.max_text_chars)
+        return round_value(value, self.digits)
+
+    @staticmethod
+    def _shrink(data):
+        texts = [(len(v), key) for key, v in data.items() if isinstance(v, str) and len(v) > 40]
+        if texts:
+            length, key = max(texts)
+            data[key] = truncate_text(data[key], length // 2)
+            return True
+        for value in data.values():
+            if isinstance(value, dict) and len(value.get("lastCloses") or []) > 1:
+                value["lastCloses"] = value["lastCloses"][1:]
+                return True
+        return False
+
+    def encode(self, name, data):
+        payload = {"name": name, "data": self._prepare(data)}
+        budget = self.budgets.get(name)
+        tokens = estimate_tokens(self._dumps(payload))
+        while budget is not None and tokens > budget and self._shrink(payload["data"]):
+            tokens = estimate_tokens(self._dumps(payload))
+        payload["tokens"] = tokens
+        return self._dumps(payload)
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from tools import FinanceTools, market_data
+
+class QuoteService:
+    """Quick-view quote metrics with stale-while-revalidate refresh.
+
+    Entries younger than ``ttl`` are served as-is. Older entries (up to
+    ``max_stale``) are still served immediately, and a refresh is queued in the
+    background. Tickers requested within the same ``debounce`` window are
+    fetched together with one bulk ``fetch`` call, and a ticker already queued
+    is never queued twice. At most ``max_entries`` tickers are kept; the least
+    recently requested are dropped first.
+    """
+    def __init__(self, fetch=None, ttl=30, max_stale=900, debounce=0.05, max_batch=50, max_entries=1024):
+        self.fetch = fetch or market_data.refresh_infos
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.debounce = debounce
+        self.max_batch = max_batch
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._pending = []
+        self._inflight = {}
+        self._cond = threading.Condition()
+        self._worker = None
+        self.batches = 0
+
+    def get(self, ticker, timeout=5.0):
+        return self.get_many([ticker], timeout=timeout).get(ticker.upper())
+
+    def get_many(self, tickers, timeout=5.0):
+        """Return ``{ticker: metrics}``, waiting up to ``timeout`` only for tickers never fetched before.
+
+        Tickers still loading after ``timeout`` map to ``None``.
+        """
+        tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+        now = time.monotonic()
+        results, refresh = {}, []
+        with self._cond:
+            for ticker in tickers:
+                entry = self._entries.get(ticker)
+                if entry is not None:
+                    self._entries.move_to_end(ticker)
+                    if now - entry[0] < self.max_stale:
+                        results[ticker] = entry[1]
+                if entry is None or now - entry[0] >= self.ttl:
+                    refresh.append(ticker)
+            waiting = self._schedule(refresh)
+        deadline = now + timeout
+        for ticker, event in waiting.items():
+            if ticker not in results and event.wait(max(deadline - time.monotonic(), 0)):
+                with self._cond:
+                    entry = self._entries.get(ticker)
+                if entry is not None:
+                    results[ticker] = entry[1]
+        return {ticker: results.get(ticker) for ticker in tickers}
+
+    def age(self, ticker):
+        with self._cond:
+            entry = self._entries.get(ticker.upper())
+        return None if entry is None else time.monotonic() - entry[0]
+
+    def _schedule(self, tickers):
+        events = {}
+        for ticker in tickers:
+            if ticker not in self._inflight:
+                self._inflight[ticker] = threading.Event()
+                self._pending.append(ticker)
+            events[ticker] = self._inflight[ticker]
+        if self._pending:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="quote-service", daemon=True)
+                self._worker.start()
+            self._cond.notify()
+        return events
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            time.sleep(self.debounce)
+            with self._cond:
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self._refresh(batch)
+
+    def _refresh(self, batch):
+        try:
+            try:
+                infos = self.fetch(batch) or {}
+                error = None
+            except Exception as e:
+                infos, error = {}, e
+            fetched_at = time.monotonic()
+            metrics, reasons = {}, {}
+            for ticker in batch:
+                info = infos.get(ticker)
+                if not info:
+                    continue
+                try:
+                    metrics[ticker] = FinanceTools.format_stock_metrics(info)
+                except Exception as e:
+                    reasons[ticker] = f"unreadable data ({e})"
+            with self._cond:
+                self.batches += 1
+                for ticker in batch:
+                    if ticker in metrics:
+                        self._entries[ticker] = (fetched_at, metrics[ticker])
+                    elif ticker not in self._entries:
+                        reason = reasons.get(ticker) or error or "no data returned"
+                        self._entries[ticker] = (fetched_at, {"Error": f"Could not fetch metrics: {reason}"})
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        finally:
+            # Waiters must be released even if this batch failed unexpectedly.
+            with self._cond:
+                for ticker in batch:
+                    event = self._inflight.pop(ticker, None)
+                    if event is not None:
+                        event.set()
+
+    def stats(self):
+        with self._cond:
+            return {"entries": len(self._entries), "pending": len(self._pending), "batches": self.batches}
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_quote_service():
+    """Process-wide quote service (QUOTE_TTL configures freshness in seconds)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = QuoteService(ttl=float(os.environ.get("QUOTE_TTL", 30)))
+        return _service
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+
+class ResultStore:
+    """Persistent analysis history in SQLite with compressed, deduplicated reports.
+
+    Every analysis gets a small metadata row indexed by ticker and day.
+    Report bodies are zlib-compressed and stored once per content hash, so
+    re-running an analysis that produces the same report costs no extra
+    space. Bodies are only read when a report is opened. Reports older than
+    ``ttl`` are dropped, and the least recently opened ones are evicted
+    once the bodies exceed ``max_bytes``. Rows can carry an ``owner`` key
+    (the app uses one per browser session) that ``latest`` and ``history``
+    filter on.
+    """
+    def __init__(self, path, ttl=30 * 86400, max_bytes=128 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            "hash TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, request TEXT NOT NULL, request_key TEXT NOT NULL, "
+            "ticker TEXT, day TEXT NOT NULL, created_at REAL NOT NULL, report_hash TEXT NOT NULL, owner TEXT)"
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(analyses)")}
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE analyses ADD COLUMN owner TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_ticker_day ON analyses (ticker, day)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_request ON analyses (request_key, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_report ON analyses (report_hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_owner ON analyses (owner, created_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def request_key(request):
+        return " ".join(request.lower().split())
+
+    def save(self, request, report, ticker=None, owner=None):
+        """Record an analysis and return its ID; identical report bodies are stored once."""
+        if ticker is None:
+            from agent_orchestrator import extract_ticker
+            ticker = extract_ticker(request)
+        body = zlib.compress(report.encode("utf-8"))
+        digest = hashlib.sha256(report.encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO reports (hash, body, size, last_access) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (hash) DO UPDATE SET last_access = excluded.last_access",
+                (digest, body, len(body), now),
+            )
+            analysis_id = self._conn.execute(
+                "INSERT INTO analyses (request, request_key, ticker, day, created_at, report_hash, owner) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (request, self.request_key(request), ticker, datetime.fromtimestamp(now).date().isoformat(), now, digest, owner),
+            ).lastrowid
+            self._evict(now)
+            self._conn.commit()
+            return analysis_id
+
+    def latest(self, request, max_age=None, owner=None):
+        """Metadata of the newest stored analysis for ``request``, if any is younger than ``max_age``.
+
+        With ``owner``, only that owner's analyses are considered.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        clauses, params = ["request_key = ?", "created_at >= ?"], [self.request_key(request), time.time() - max_age]
+        if owner is not None:
+            clauses.append("owner = ?")
+            params.append(owner)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, request, ticker, day, created_at, owner FROM analyses "
+                f"WHERE {' AND '.join(clauses)} ORDER BY created_at DESC LIMIT 1",
+                params,
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def history(self, ticker=None, day=None, owner=None, limit=20, offset=0):
+        """Newest-first analysis metadata, without report bodies."""
+        clauses, params = [], []
+        if owner is not None:
+            clauses.append("owner = ?")
+            params.append(owner)
+        if ticker:
+            clauses.append("ticker = ?")
+            params.append(ticker.upper())
+        if day:
+            clauses.append("day = ?")
+            params.append(day)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, request, ticker, day, created_at, owner FROM analyses {where}"
+                "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def load(self, analysis_id):
+        """Decompress and return the report for ``analysis_id``, or None once evicted."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reports.hash, reports.body FROM analyses JOIN reports ON reports.hash = analyses.report_hash "
+                "WHERE analyses.id = ?",
+                (analysis_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE reports SET last_access = ? WHERE hash = ?", (time.time(), row["hash"]))
+            self._conn.commit()
+        return zlib.decompress(row["body"]).decode("utf-8")
+
+    def _evict(self, now):
+        expired = self._conn.execute("DELETE FROM analyses WHERE created_at < ?", (now - self.ttl,)).rowcount
+        self.evictions += max(expired, 0)
+        self._conn.execute("DELETE FROM reports WHERE hash NOT IN (SELECT report_hash FROM analyses)")
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM reports").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for digest, size in self._conn.execute(
+            "SELECT hash, size FROM reports ORDER BY last_access ASC"
+        ).fetchall():
+            self.evictions += self._conn.execute("DELETE FROM analyses WHERE report_hash = ?", (digest,)).rowcount
+            self._conn.execute("DELETE FROM reports WHERE hash = ?", (digest,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            analyses = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            reports, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports").fetchone()
+        return {"analyses": analyses, "reports": reports, "bytes": total, "evictions": self.evictions}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM analyses")
+            self._conn.execute("DELETE FROM reports")
+            self._conn.commit()
+
+    def shutdown(self):
+        with self._lock:
+            self._conn.close()
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_result_store():
+    """Process-wide result store (RESULT_STORE_PATH, RESULT_TTL and RESULT_MAX_MB configure it)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultStore(
+                os.environ.get(
+                    "RESULT_STORE_PATH",
+                    os.path.join(os.path.expanduser("~"), ".cache", "stock_analysis", "results.sqlite"),
+                ),
+                ttl=float(os.environ.get("RESULT_TTL", 30 * 86400)),
+                max_bytes=int(os.environ.get("RESULT_MAX_MB", 128)) * 1024 * 1024,
+            )
+        return _store
@@ -0,0 +1,161 @@
+"""Rank a universe of tickers with the strategy rules, then analyze only the best.
+
+    python screener.py --universe sp500.csv --top 10
+    python screener.py --universe sp500.csv --top 10 --analyze --output top10.jsonl
+"""
+import argparse
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import indicators
+from agent_pool import get_agent_pool
+from batch_analysis import DEFAULT_REQUEST, ResultWriter, load_portfolio, run_batch
+from tools import market_data
+from tracing import tracer
+
+# Risk thresholds from the strategy_agent system prompt and risk_assessment_tool.
+HIGH_RISK_BETA = 1.2
+MODERATE_RISK_BETA = 0.8
+STABLE_BETA = 0.9
+
+SIGNAL_SCORES = {"Buy": 1.0, "Hold": 0.0, "Sell": -1.0}
+
+def classify(frame, max_volatility=None):
+    """Apply the strategy rules to every row of a tickers x metrics frame at once.
+
+    Expects the indicator snapshot columns plus ``Beta``, ``Volatility``
+    (52-week change) and ``DividendYield``. Adds ``Signal``, ``RiskRating``,
+    ``RiskFlag`` and ``Score``. Rows without a beta are rated ``Unknown``
+    and flagged ``No Risk Data`` rather than scored with a guessed beta.
+    The strategy prompt leaves "high volatility" undefined, so rows are only
+    flagged ``High Risk`` on volatility when ``max_volatility`` (an absolute
+    52-week change, e.g. 0.5) is given.
+    """
+    frame = frame.copy()
+    frame["Signal"] = indicators.strategy_signal(frame["MACD"], frame["MACD_Signal"], frame["RSI"])
+    beta = frame["Beta"]
+    missing = beta.isna()
+    frame["RiskRating"] = np.select(
+        [missing, beta > HIGH_RISK_BETA, beta > MODERATE_RISK_BETA], ["Unknown", "High", "Moderate"], default="Low"
+    )
+    high_risk = beta > HIGH_RISK_BETA
+    if max_volatility is not None:
+        high_risk |= frame["Volatility"].abs() > max_volatility
+    stable = (beta < STABLE_BETA) & (frame["DividendYield"].fillna(0) > 0)
+    frame["RiskFlag"] = np.select([high_risk, missing, stable], ["High Risk", "No Risk Data", "Stable"], default="")
+    # Momentum as a percentage of price, so names trading at different levels compare fairly.
+    momentum = ((frame["MACD"] - frame["MACD_Signal"]) / frame["Last_Close"] * 100).clip(-1, 1)
+    frame["Score"] = (
+        frame["Signal"].map(SIGNAL_SCORES)
+        + momentum
+        - 0.5 * (frame["RiskFlag"] == "High Risk")
+        + 0.25 * (frame["RiskFlag"] == "Stable")
+    )
+    return frame
+
+def _close_matrix(tickers, period, max_workers):
+    def load(ticker):
+        try:
+            return ticker, market_data.get_history(ticker, period=period)["Close"]
+        except Exception:
+            return ticker, None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        closes = {ticker: close for ticker, close in pool.map(load, tickers) if close is not None and not close.empty}
+    return pd.DataFrame(closes).sort_index()
+
+def _risk_metrics(tickers, batch_size=100):
+    infos = {}
+    for i in range(0, len(tickers), batch_size):
+        batch = tickers[i:i + batch_size]
+        try:
+            infos.update(market_data.refresh_infos(batch))
+        except Exception:
+            # Retry one by one so a single bad symbol cannot drop the whole batch.
+            for ticker in batch:
+                try:
+                    infos.update(market_data.refresh_infos([ticker]))
+                except Exception:
+                    pass
+    rows = {}
+    for ticker, info in infos.items():
+        if info:
+            rows[ticker] = {
+                "Beta": info.get("beta"),
+                "Volatility": info.get("52WeekChange"),
+                "DividendYield": info.get("dividendYield"),
+            }
+    return pd.DataFrame.from_dict(rows, orient="index", columns=["Beta", "Volatility", "DividendYield"], dtype=float)
+
+@tracer.traced("screen")
+def screen(tickers, period="6mo", max_workers=16, max_volatility=None):
+    """Score and rank ``tickers``; symbols without enough price history are dropped."""
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    snapshot = indicators.snapshot(_close_matrix(tickers, period, max_workers)).dropna()
+    frame = snapshot.join(_risk_metrics(list(snapshot.index)))
+    tracer.set_attribute("tickers", len(tickers))
+    tracer.set_attribute("ranked", len(frame))
+    tracer.set_attribute("missing_risk_data", int(frame["Beta"].isna().sum()))
+    return classify(frame, max_volatility=max_volatility).sort_values("Score", ascending=False)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank a universe numerically and analyze the top candidates.")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols to screen")
+    parser.add_argument("--universe", help="Text file (one ticker per line) or CSV with a ticker/symbol column")
+    parser.add_argument("--top", type=int, default=10, help="Number of candidates to keep")
+    parser.add_argument("--period", default="6mo", help="History window for the indicators")
+    parser.add_argument(
+        "--max-volatility", type=float,
+        help="Also flag High Risk when the absolute 52-week change exceeds this (e.g. 0.5)"
+    )
+    parser.add_argument("--signal", choices=["Buy", "Hold", "Sell", "any"], default="any", help="Keep only this signal")
+    parser.add_argument("--analyze", action="store_true", help="Run the agents on the top candidates")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum concurrent analyses")
+    parser.add_argument("--timeout", type=float, default=300, help="Per-analysis timeout in seconds")
+    parser.add_argument("--format", choices=["jsonl", "markdown"], default="jsonl")
+    parser.add_argument("--output", help="JSONL file or Markdown directory for the analyses")
+    parser.add_argument("--request", default=DEFAULT_REQUEST, help="Request template; {ticker} is substituted")
+    args = parser.parse_args(argv)
+
+    tickers = [t.upper() for t in args.tickers]
+    if args.universe:
+        tickers += load_portfolio(args.universe)
+    if not tickers:
+        parser.error("no tickers given")
+    if args.analyze and not os.environ.get("OPENAI_API_KEY"):
+        parser.error("OPENAI_API_KEY is not set")
+
+    ranked = screen(tickers, period=args.period, max_volatility=args.max_volatility)
+    if args.signal != "any":
+        ranked = ranked[ranked["Signal"] == args.signal]
+    top = ranked.head(args.top)
+    print(f"Screened {len(tickers)} tickers, {len(ranked)} ranked", file=sys.stderr)
+    missing = ranked.index[ranked["RiskFlag"] == "No Risk Data"]
+    if len(missing):
+        print(f"No risk data for {len(missing)} tickers: {', '.join(missing[:20])}", file=sys.stderr)
+    columns = ["Signal", "RiskFlag", "Score", "RSI", "MACD", "MACD_Signal", "Beta", "Last_Close"]
+    print(top[columns].round(3).to_string())
+    if not args.analyze or top.empty:
+        return 0
+
+    output = args.output or ("screen_top.jsonl" if args.format == "jsonl" else "screen_top")
+    writer = ResultWriter(output, args.format)
+    get_agent_pool(max_size=args.workers)
+
+    def report(record):
+        writer.write(record)
+        print(f"[{record['status']}] {record['ticker']} ({record['duration']:.1f}s)", file=sys.stderr)
+
+    try:
+        results = asyncio.run(run_batch(list(top.index), args.request, args.workers, args.timeout, on_result=report))
+    finally:
+        writer.close()
+    failed = sum(1 for r in results if r["status"] != "ok")
+    print(f"{len(results) - failed}/{len(results)} analyses succeeded -> {output}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
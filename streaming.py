@@ -0,0 +1,82 @@
+import json
+import re
+from contextlib import ExitStack, contextmanager
+from agent_hooks import MESSAGE_HOOK
+
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+def message_events(agent_name, message):
+    """Split an AutoGen message into display events: text, tool calls and tool results."""
+    if isinstance(message, str):
+        message = {"content": message}
+    events = []
+    for call in message.get("tool_calls") or []:
+        function = call.get("function", {})
+        events.append({
+            "agent": agent_name,
+            "kind": "tool_call",
+            "content": f"{function.get('name')}({function.get('arguments', '')})",
+        })
+    for response in message.get("tool_responses") or []:
+        events.append({"agent": agent_name, "kind": "tool_result", "content": str(response.get("content", ""))})
+    content = message.get("content")
+    if content and not message.get("tool_responses"):
+        events.append({"agent": agent_name, "kind": "message", "content": str(content)})
+    return events
+
+class MessageStream:
+    """Reports every message an agent sends, as it is sent, through ``on_message``."""
+    def __init__(self, on_message):
+        self.on_message = on_message
+
+    def _hook(self, sender, message, recipient, silent):
+        for event in message_events(sender.name, message):
+            self.on_message(event)
+        return message
+
+    @contextmanager
+    def attached(self, agents):
+        for agent in agents:
+            agent.register_hook(MESSAGE_HOOK, self._hook)
+        try:
+            yield self
+        finally:
+            for agent in agents:
+                hooks = agent.hook_lists[MESSAGE_HOOK]
+                if self._hook in hooks:
+                    hooks.remove(self._hook)
+
+class TokenStream:
+    """AutoGen IOStream that forwards streamed model output to ``on_token``.
+
+    AutoGen prints streamed chunks with ``end=""``; everything else it prints
+    (message headers, echoes of received messages) is dropped, since those
+    messages already reach the UI through ``MessageStream``.
+    """
+    def __init__(self, on_token):
+        self.on_token = on_token
+
+    def print(self, *objects, sep=" ", end="\n", flush=False):
+        if end == "":
+            self.on_token(_ANSI_ESCAPE.sub("", sep.join(str(o) for o in objects)))
+
+    def input(self, prompt="", *, password=False):
+        raise RuntimeError("interactive input is not available while streaming")
+
+@contextmanager
+def stream_conversation(agents, on_message=None, on_token=None):
+    """Attach message and token callbacks to ``agents`` for the duration of a chat."""
+    with ExitStack() as stack:
+        if on_message is not None:
+            stack.enter_context(MessageStream(on_message).attached(agents))
+        if on_token is not None:
+            from autogen.io import IOStream
+            stack.enter_context(IOStream.set_default(TokenStream(on_token)))
+        yield
+
+def tool_result_event(name, result):
+    try:
+        content = json.dumps(json.loads(result), indent=2)
+    except ValueError:
+        content = result
+    return {"agent": "supervisor", "kind": "tool_result", "tool": name, "content": content}
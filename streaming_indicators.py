@@ -0,0 +1,241 @@
+import math
+from collections import deque
+
+class RollingSum:
+    """Last ``window`` values and their running sum, updated in O(1) per append.
+
+    The sum is recomputed exactly once per full turn of the window, so the
+    rounding error from subtracting evicted values cannot build up.
+    """
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self._since_resync = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, value):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        self._since_resync += 1
+        if self._since_resync == self.window:
+            self.total = math.fsum(self.values)
+            self._since_resync = 0
+
+    def restore(self, values, total=None):
+        self.values.extend(values)
+        self.total = math.fsum(self.values) if total is None else total
+
+class StreamingSMA:
+    """Simple moving average updated one bar at a time."""
+    kind = "sma"
+
+    def __init__(self, window=20):
+        self.window = window
+        self._values = RollingSum(window)
+
+    def update(self, value):
+        self._values.append(float(value))
+        return self.value
+
+    @property
+    def value(self):
+        if len(self._values) < self.window:
+            return None
+        return self._values.total / self.window
+
+    def to_dict(self):
+        return {"kind": self.kind, "window": self.window, "values": list(self._values.values), "sum": self._values.total}
+
+    @classmethod
+    def from_dict(cls, state):
+        indicator = cls(window=state["window"])
+        indicator._values.restore(state["values"], state.get("sum"))
+        return indicator
+
+class StreamingEMA:
+    """Exponential moving average matching ``ewm(span=..., adjust=False)``."""
+    kind = "ema"
+
+    def __init__(self, span=20, alpha=None):
+        self.span = span
+        self.alpha = alpha if alpha is not None else 2 / (span + 1)
+        self.value = None
+
+    def update(self, value):
+        value = float(value)
+        self.value = value if self.value is None else self.value + self.alpha * (value - self.value)
+        return self.value
+
+    def to_dict(self):
+        return {"kind": self.kind, "span": self.span, "alpha": self.alpha, "value": self.value}
+
+    @classmethod
+    def from_dict(cls, state):
+        indicator = cls(span=state["span"], alpha=state["alpha"])
+        indicator.value = state["value"]
+        return indicator
+
+class StreamingRSI:
+    """RSI over closing prices, either the simple rolling-mean variant used by
+    the tools or Wilder's smoothing.
+
+    The first bar counts as a zero change, exactly as ``close.diff()`` followed
+    by ``where(..., 0)`` does in the batch formula.
+    """
+    kind = "rsi"
+
+    def __init__(self, window=14, wilder=False):
+        self.window = window
+        self.wilder = wilder
+        self.prev_close = None
+        self._gains = RollingSum(window)
+        self._losses = RollingSum(window)
+        self._avg_gain = StreamingEMA(span=None, alpha=1 / window)
+        self._avg_loss = StreamingEMA(span=None, alpha=1 / window)
+
+    def update(self, close):
+        close = float(close)
+        change = 0.0 if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if self.wilder:
+            self._avg_gain.update(gain)
+            self._avg_loss.update(loss)
+        else:
+            self._gains.append(gain)
+            self._losses.append(loss)
+        return self.value
+
+    @property
+    def value(self):
+        if self.wilder:
+            avg_gain, avg_loss = self._avg_gain.value, self._avg_loss.value
+            if avg_gain is None:
+                return None
+        else:
+            if len(self._gains) < self.window:
+                return None
+            # Gains and losses are non-negative, so a slightly negative sum is rounding error.
+            avg_gain = max(self._gains.total, 0.0) / self.window
+            avg_loss = max(self._losses.total, 0.0) / self.window
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else None
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "window": self.window,
+            "wilder": self.wilder,
+            "prev_close": self.prev_close,
+            "gains": list(self._gains.values),
+            "losses": list(self._losses.values),
+            "gain_sum": self._gains.total,
+            "loss_sum": self._losses.total,
+            "avg_gain": self._avg_gain.value,
+            "avg_loss": self._avg_loss.value,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        indicator = cls(window=state["window"], wilder=state["wilder"])
+        indicator.prev_close = state["prev_close"]
+        indicator._gains.restore(state["gains"], state.get("gain_sum"))
+        indicator._losses.restore(state["losses"], state.get("loss_sum"))
+        indicator._avg_gain.value = state["avg_gain"]
+        indicator._avg_loss.value = state["avg_loss"]
+        return indicator
+
+class StreamingMACD:
+    """MACD line and signal line matching ``indicators.macd``."""
+    kind = "macd"
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = StreamingEMA(span=fast)
+        self.slow = StreamingEMA(span=slow)
+        self.signal = StreamingEMA(span=signal)
+
+    def update(self, close):
+        line = self.fast.update(close) - self.slow.update(close)
+        self.signal.update(line)
+        return self.value
+
+    @property
+    def value(self):
+        if self.signal.value is None:
+            return None
+        return self.fast.value - self.slow.value, self.signal.value
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "fast": self.fast.to_dict(),
+            "slow": self.slow.to_dict(),
+            "signal": self.signal.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        indicator = cls()
+        indicator.fast = StreamingEMA.from_dict(state["fast"])
+        indicator.slow = StreamingEMA.from_dict(state["slow"])
+        indicator.signal = StreamingEMA.from_dict(state["signal"])
+        return indicator
+
+INDICATOR_TYPES = {cls.kind: cls for cls in [StreamingSMA, StreamingEMA, StreamingRSI, StreamingMACD]}
+
+def indicator_from_dict(state):
+    return INDICATOR_TYPES[state["kind"]].from_dict(state)
+
+class StreamingIndicatorSet:
+    """The indicators reported by the FinanceTools, kept up to date per bar.
+
+    ``snapshot()`` returns the same keys as ``indicators.snapshot``; state can
+    be checkpointed with ``to_dict()`` (JSON-serializable) and restored with
+    ``from_dict()``.
+    """
+    def __init__(self, indicators=None):
+        self.indicators = indicators or {
+            "SMA_20": StreamingSMA(window=20),
+            "EMA_20": StreamingEMA(span=20),
+            "RSI": StreamingRSI(window=14),
+            "MACD": StreamingMACD(),
+        }
+        self.last_close = None
+
+    def update(self, close):
+        for indicator in self.indicators.values():
+            indicator.update(close)
+        self.last_close = float(close)
+        return self.snapshot()
+
+    def snapshot(self):
+        values = {name: indicator.value for name, indicator in self.indicators.items()}
+        macd_value = values.pop("MACD", None)
+        values["MACD"], values["MACD_Signal"] = macd_value if macd_value is not None else (None, None)
+        values["Last_Close"] = self.last_close
+        return values
+
+    @classmethod
+    def from_history(cls, closes):
+        indicator_set = cls()
+        for close in closes:
+            indicator_set.update(close)
+        return indicator_set
+
+    def to_dict(self):
+        return {
+            "indicators": {name: indicator.to_dict() for name, indicator in self.indicators.items()},
+            "last_close": self.last_close,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        indicator_set = cls({name: indicator_from_dict(s) for name, s in state["indicators"].items()})
+        indicator_set.last_close = state["last_close"]
+        return indicator_set
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import pytest
+
+pytest.importorskip("autogen")
+pytest.importorskip("fastapi")
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+import api
+from api import STREAM_BUFFER, Flight, Overloaded, SingleFlight
+
+class Blocking:
+    """A run that blocks until released and counts how often it was started."""
+    def __init__(self, result="done"):
+        self.release = threading.Event()
+        self.calls = 0
+        self.result = result
+
+    def __call__(self, *args):
+        publish = args[-1]
+        self.calls += 1
+        publish({"agent": "a", "kind": "text", "content": "working"})
+        self.release.wait(5)
+        return self.result
+
+def test_concurrent_identical_calls_share_one_run():
+    async def scenario():
+        flights = SingleFlight(max_workers=2, max_queue=0)
+        run = Blocking()
+        try:
+            callers = [asyncio.ensure_future(flights.run(("k",), run)) for _ in range(5)]
+            await asyncio.sleep(0.05)
+            run.release.set()
+            results = await asyncio.gather(*callers)
+        finally:
+            flights.close()
+        return run.calls, results, flights.stats()
+
+    calls, results, stats = asyncio.run(scenario())
+    assert calls == 1
+    assert results == ["done"] * 5
+    assert stats["started"] == 1 and stats["coalesced"] == 4 and stats["in_flight"] == 0
+
+def test_new_keys_beyond_capacity_get_503(monkeypatch):
+    async def scenario():
+        flights = SingleFlight(max_workers=1, max_queue=0)
+        monkeypatch.setattr(api, "flights", flights)
+        run = Blocking()
+        try:
+            busy = asyncio.ensure_future(api._coalesced(("a",), run))
+            await asyncio.sleep(0.05)
+            with pytest.raises(Overloaded):
+                flights.join(("b",), run)
+            with pytest.raises(HTTPException) as error:
+                await api._coalesced(("b",), run)
+            joined = asyncio.ensure_future(api._coalesced(("a",), run))
+            run.release.set()
+            return error.value, await busy, await joined, flights.stats()
+        finally:
+            flights.close()
+
+    error, first, second, stats = asyncio.run(scenario())
+    assert error.status_code == 503 and error.headers["Retry-After"] == "5"
+    assert first == second == "done"
+    assert stats["rejected"] == 2 and stats["coalesced"] == 1
+
+def test_flight_buffer_keeps_messages_and_recent_tokens_only():
+    async def scenario():
+        flight = Flight()
+        for i in range(STREAM_BUFFER * 4):
+            flight.publish({"kind": "token", "content": str(i)})
+        flight.publish({"kind": "text", "content": "first message"})
+        for i in range(3):
+            flight.publish({"kind": "token", "content": f"next {i}"})
+        queue = flight.subscribe()
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    replayed = asyncio.run(scenario())
+    assert [event["content"] for event in replayed] == ["first message", "next 0", "next 1", "next 2"]
+
+def test_stream_unsubscribes_when_the_client_goes_away(monkeypatch):
+    async def scenario():
+        flights = SingleFlight(max_workers=1, max_queue=0)
+        monkeypatch.setattr(api, "flights", flights)
+        run = Blocking()
+        monkeypatch.setattr(api, "_analyze", run)
+        try:
+            response = await api.analysis(api.AnalysisRequest(request="Analyze AAPL"), stream=True)
+            (flight,) = flights._flights.values()
+            first = await response.body_iterator.__anext__()
+            subscribed = len(flight.subscribers)
+            await response.body_iterator.aclose()
+            return first, subscribed, len(flight.subscribers)
+        finally:
+            run.release.set()
+            flights.close()
+
+    first, subscribed, remaining = asyncio.run(scenario())
+    assert '"working"' in first
+    assert subscribed == 1 and remaining == 0
+
+def test_unknown_period_is_rejected_before_any_work(monkeypatch):
+    monkeypatch.setattr(api, "_snapshot", lambda *args: pytest.fail("period was not validated"))
+    response = TestClient(api.app).get("/indicators", params={"tickers": "AAPL", "period": "7mo"})
+    assert response.status_code == 422
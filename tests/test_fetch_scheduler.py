@@ -0,0 +1,170 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from benchmarks.fake_market_data import FakeMarketDataProvider
+from fetch_scheduler import FetchScheduler, TokenBucket
+
+class FlakyProvider(FakeMarketDataProvider):
+    """Fake upstream whose first ``failures`` downloads fail, and whose ``bad`` symbols have no info."""
+    def __init__(self, failures=0, bad=(), **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.bad = set(bad)
+        self.batches = []
+
+    def download(self, tickers, period=None, start=None, interval="1d"):
+        with self._lock:
+            self.batches.append(sorted(tickers))
+            failing = self.failures > 0
+            self.failures -= 1
+        if failing:
+            self._count("download")
+            raise RuntimeError("429 Too Many Requests (simulated)")
+        return super().download(tickers, period=period, start=start, interval=interval)
+
+    def info(self, ticker):
+        if ticker in self.bad:
+            raise RuntimeError(f"404 {ticker} not found")
+        return super().info(ticker)
+
+def _scheduler(provider, **kwargs):
+    options = {"rate": 1000, "burst": 1000, "batch_window": 0.1, "backoff": 0.01}
+    options.update(kwargs)
+    return FetchScheduler(backend=provider, **options)
+
+def _fetch_all(scheduler, tickers, **kwargs):
+    with ThreadPoolExecutor(max_workers=len(tickers)) as pool:
+        return list(pool.map(lambda ticker: scheduler.history(ticker, **kwargs), tickers))
+
+def test_concurrent_requests_share_one_download():
+    provider = FlakyProvider()
+    scheduler = _scheduler(provider)
+    tickers = ["AAPL", "MSFT", "NVDA", "GOOG", "AMZN", "META"]
+
+    frames = _fetch_all(scheduler, tickers, period="6mo")
+
+    assert provider.calls["download"] == 1
+    assert provider.batches == [sorted(tickers)]
+    for ticker, frame in zip(tickers, frames):
+        expected = provider.history(ticker, period="6mo")
+        np.testing.assert_array_equal(frame["Close"].to_numpy(), expected["Close"].to_numpy())
+    metrics = scheduler.metrics()
+    assert (metrics["bulk_downloads"], metrics["batched_tickers"], metrics["in_flight"]) == (1, 6, 0)
+
+def test_batches_are_capped_at_max_batch():
+    provider = FlakyProvider()
+    scheduler = _scheduler(provider, max_batch=10)
+
+    _fetch_all(scheduler, [f"T{i:02d}" for i in range(25)], period="1mo")
+
+    assert sorted(len(batch) for batch in provider.batches) == [5, 10, 10]
+
+def test_duplicate_requests_are_coalesced():
+    provider = FlakyProvider()
+    scheduler = _scheduler(provider)
+
+    frames = _fetch_all(scheduler, ["AAPL"] * 5, period="6mo")
+
+    assert provider.batches == [["AAPL"]]
+    assert scheduler.metrics()["coalesced"] == 4
+    # Every caller gets its own copy.
+    assert len({id(frame) for frame in frames}) == 5
+
+def test_different_windows_are_fetched_separately():
+    provider = FlakyProvider()
+    scheduler = _scheduler(provider)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        short = pool.submit(scheduler.history, "AAPL", period="1mo")
+        long = pool.submit(scheduler.history, "AAPL", period="1y")
+        assert len(long.result()) > len(short.result())
+
+    assert provider.calls["download"] == 2
+
+def test_unknown_symbol_gets_an_empty_frame():
+    class Partial(FlakyProvider):
+        def download(self, tickers, **kwargs):
+            return {ticker: frame for ticker, frame in super().download(tickers, **kwargs).items() if ticker != "GONE"}
+
+    scheduler = _scheduler(Partial())
+    good, gone = _fetch_all(scheduler, ["AAPL", "GONE"], period="1mo")
+
+    assert not good.empty
+    assert gone.empty
+    assert list(gone.columns) == ["Open", "High", "Low", "Close", "Volume"]
+
+def test_failed_downloads_are_retried():
+    provider = FlakyProvider(failures=2)
+    scheduler = _scheduler(provider, max_retries=3)
+
+    frame = scheduler.history("AAPL", period="1mo")
+
+    assert not frame.empty
+    assert provider.calls["download"] == 3
+    metrics = scheduler.metrics()
+    assert (metrics["requests"], metrics["retries"], metrics["errors"]) == (3, 2, 0)
+
+def test_every_waiter_sees_the_error_once_retries_run_out():
+    provider = FlakyProvider(failures=10)
+    scheduler = _scheduler(provider, max_retries=1)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(scheduler.history, ticker, period="1mo") for ticker in ["AAPL", "MSFT", "AAPL"]]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="429"):
+                future.result()
+
+    assert provider.calls["download"] == 2
+    assert scheduler.metrics()["errors"] == 1
+
+def test_token_bucket_limits_the_rate_after_the_burst():
+    bucket = TokenBucket(rate=20, burst=2)
+    started = time.monotonic()
+    waits = [bucket.acquire() for _ in range(6)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert all(wait > 0 for wait in waits[2:])
+    assert time.monotonic() - started >= 4 / 20 * 0.9
+
+def test_upstream_calls_are_throttled():
+    provider = FlakyProvider()
+    tickers = ["AAPL", "MSFT", "NVDA", "GOOG"]
+    for ticker in tickers:
+        provider.info(ticker)  # Build the synthetic series up front so each call is instant.
+    scheduler = _scheduler(provider, rate=10, burst=1, batch_window=0.0)
+    started = time.monotonic()
+
+    for ticker in tickers:
+        scheduler.info(ticker)
+
+    assert time.monotonic() - started >= 3 / 10 * 0.9
+    metrics = scheduler.metrics()
+    assert metrics["throttled"] == 3
+    assert metrics["throttle_wait_s"] > 0
+
+def test_bulk_infos_isolate_failures():
+    provider = FlakyProvider(bad={"BADX"})
+    scheduler = _scheduler(provider, max_retries=1)
+
+    infos = scheduler.infos(["AAPL", "BADX", "MSFT"])
+
+    assert infos["BADX"] is None
+    assert infos["AAPL"]["shortName"] == "AAPL Corp"
+    assert infos["MSFT"]["shortName"] == "MSFT Corp"
+
+def test_bulk_infos_do_not_hold_up_history_downloads():
+    provider = FlakyProvider()
+    scheduler = _scheduler(provider, rate=10, burst=2, batch_window=0.0)
+    background = threading.Thread(target=scheduler.infos, args=([f"T{i:02d}" for i in range(20)],))
+    background.start()
+    time.sleep(0.05)
+
+    started = time.monotonic()
+    scheduler.history("AAPL", period="1mo")
+    elapsed = time.monotonic() - started
+    background.join()
+
+    # Twenty reserved info tokens at 10/s would delay the download by about two seconds.
+    assert elapsed < 0.5
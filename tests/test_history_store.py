@@ -0,0 +1,137 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from history_store import RECORD_DTYPE, HistoryStore, period_offset
+
+def _bars(start, periods, close=100.0):
+    index = pd.bdate_range(start=start, periods=periods, tz="America/New_York")
+    closes = close + np.arange(periods, dtype=float)
+    return pd.DataFrame({
+        "Open": closes,
+        "High": closes + 1,
+        "Low": closes - 1,
+        "Close": closes,
+        "Volume": np.full(periods, 1_000.0),
+    }, index=index)
+
+class RecordingSource:
+    """Offline upstream with five years of synthetic daily bars per ticker.
+
+    Serves ``history`` by period or start date like yfinance, and records the
+    arguments of every call. ``recorded`` overrides the bars for a ticker.
+    """
+    def __init__(self):
+        self.recorded = {}
+        self.requests = []
+
+    def _bars(self, ticker):
+        if ticker in self.recorded:
+            return self.recorded[ticker]["history"]
+        end = pd.Timestamp.now(tz="America/New_York").normalize()
+        index = pd.bdate_range(end=end, periods=252 * 5, tz="America/New_York")
+        return _bars(index[0], len(index), close=float(sum(map(ord, ticker))))
+
+    def history(self, ticker, period=None, interval="1d", start=None):
+        self.requests.append({"ticker": ticker, "period": period, "start": start})
+        frame = self._bars(ticker)
+        if start is not None:
+            return frame[frame.index >= pd.Timestamp(start, tz=frame.index.tz)].copy()
+        offset = period_offset(period)
+        if offset is None:
+            return frame.copy()
+        return frame[frame.index >= pd.Timestamp.now(tz=frame.index.tz) - offset].copy()
+
+    def info(self, ticker):
+        return {"shortName": f"{ticker} Corp"}
+
+@pytest.fixture
+def source():
+    return RecordingSource()
+
+@pytest.fixture
+def store(tmp_path, source):
+    return HistoryStore(str(tmp_path / "history"), source=source, backfill_period="2y", refresh_interval=0)
+
+def test_first_read_backfills_the_full_period(store, source):
+    frame = store.history("aapl", period="6mo")
+
+    assert source.requests == [{"ticker": "AAPL", "period": "2y", "start": None}]
+    expected = source.history("AAPL", period="2y")
+    assert len(store.read("AAPL")) == len(expected)
+    cutoff = pd.Timestamp.now(tz="UTC") - pd.DateOffset(months=6)
+    assert frame.index.min() >= cutoff
+    assert str(frame.index.tz) == "America/New_York"
+    np.testing.assert_allclose(frame["Close"].to_numpy(), expected.loc[expected.index >= cutoff, "Close"].to_numpy())
+
+def test_update_fetches_only_bars_after_the_last_stored_one(store, source):
+    full = _bars(pd.Timestamp.now().normalize() - pd.offsets.BDay(40), 30)
+    source.recorded["XYZ"] = {"history": full.iloc[:20], "info": {}}
+    assert store.update("XYZ") == 20
+
+    source.recorded["XYZ"]["history"] = full
+    source.requests.clear()
+    # The stored last bar is re-sent (it may have been a live session bar) and replaces itself.
+    assert store.update("XYZ") == 11
+
+    assert source.requests[0]["period"] is None
+    assert source.requests[0]["start"] == full.index[19].date()
+    stored = store.frame("XYZ")
+    assert len(stored) == 30
+    assert os.path.getsize(store._data_path("XYZ")) == 30 * RECORD_DTYPE.itemsize
+    np.testing.assert_array_equal(stored["Close"].to_numpy(), full["Close"].to_numpy())
+
+def test_append_replaces_the_last_bar_with_the_same_timestamp(store):
+    bars = _bars("2024-03-01", 5)
+    assert store.append("XYZ", bars) == 5
+
+    live = bars.iloc[-1:].copy()
+    live["Close"] = 999.0
+    assert store.append("XYZ", live) == 1
+
+    stored = store.frame("XYZ")
+    assert len(stored) == 5
+    assert stored["Close"].iloc[-1] == 999.0
+    np.testing.assert_array_equal(stored["Close"].iloc[:-1].to_numpy(), bars["Close"].iloc[:-1].to_numpy())
+
+def test_append_ignores_bars_older_than_the_last_stored_one(store):
+    bars = _bars("2024-03-01", 5)
+    store.append("XYZ", bars)
+
+    assert store.append("XYZ", bars.iloc[:3]) == 0
+    assert len(store.read("XYZ")) == 5
+
+def test_wider_period_than_stored_coverage_backfills_again(tmp_path, source):
+    store = HistoryStore(str(tmp_path), source=source, backfill_period="6mo", refresh_interval=3600)
+    store.history("AAPL", period="3mo")
+    assert [r["period"] for r in source.requests] == ["6mo"]
+
+    frame = store.history("AAPL", period="1y")
+
+    assert [r["period"] for r in source.requests] == ["6mo", "1y"]
+    assert store._read_meta("AAPL")["coverage"] == "1y"
+    assert frame.index.min() < pd.Timestamp.now(tz="UTC") - pd.DateOffset(months=6)
+
+def test_fresh_reads_are_served_from_disk(tmp_path, source):
+    store = HistoryStore(str(tmp_path), source=source, refresh_interval=3600)
+    first = store.history("AAPL", period="3mo")
+    second = store.history("AAPL", period="3mo")
+
+    assert len(source.requests) == 1
+    pd.testing.assert_frame_equal(first, second)
+
+@pytest.mark.parametrize("ticker", ["../../escaped", "a/b", "..", "", "X" * 16])
+def test_rejects_symbols_that_are_not_tickers(tmp_path, source, ticker):
+    store = HistoryStore(str(tmp_path / "store" / "history"), source=source)
+
+    with pytest.raises(ValueError):
+        store.history(ticker)
+    with pytest.raises(ValueError):
+        store.append(ticker, _bars("2024-03-01", 2))
+    assert not source.requests
+    assert os.listdir(tmp_path) == []
+
+@pytest.mark.parametrize("ticker", ["BRK-B", "BRK.B", "^GSPC", "EURUSD=X"])
+def test_accepts_exchange_symbols(store, ticker):
+    assert store.append(ticker, _bars("2024-03-01", 2)) == 2
+    assert store.tickers() == [ticker]
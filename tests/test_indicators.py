@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+import indicators
+
+def _closes(seed, periods=120):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2024-01-01", periods=periods)
+    return pd.Series(100 + rng.normal(0, 1, periods).cumsum(), index=index)
+
+def _own_snapshot(close, name):
+    return indicators.snapshot(close.rename(name)).loc[name]
+
+def test_snapshot_skips_gaps_instead_of_bridging_them():
+    full = _closes(0)
+    gapped = full.drop(full.index[100])
+    matrix = pd.DataFrame({"FULL": full, "GAP": gapped})
+    assert matrix["GAP"].isna().sum() == 1
+
+    snap = indicators.snapshot(matrix)
+
+    pd.testing.assert_series_equal(snap.loc["GAP"], _own_snapshot(gapped, "GAP"))
+    pd.testing.assert_series_equal(snap.loc["FULL"], _own_snapshot(full, "FULL"))
+
+def test_snapshot_uses_each_tickers_own_last_bar():
+    full = _closes(1)
+    stale = full.iloc[:-3]
+    snap = indicators.snapshot(pd.DataFrame({"FULL": full, "STALE": stale}))
+
+    pd.testing.assert_series_equal(snap.loc["STALE"], _own_snapshot(stale, "STALE"))
+    assert snap.loc["STALE", "Last_Close"] == stale.iloc[-1]
+
+def test_snapshot_leaves_short_histories_nan():
+    full = _closes(2)
+    short = full.iloc[-10:]
+    snap = indicators.snapshot(pd.DataFrame({"FULL": full, "SHORT": short}))
+
+    assert np.isnan(snap.loc["SHORT", "SMA_20"])
+    assert np.isnan(snap.loc["SHORT", "RSI"])
+    assert snap.loc["FULL", ["SMA_20", "RSI"]].notna().all()
+
+@pytest.mark.parametrize("macd_line, signal_line, rsi_value", [
+    (np.nan, 0.0, 30.0),
+    (1.0, np.nan, 30.0),
+    (1.0, 0.0, np.nan),
+])
+def test_strategy_signal_holds_on_missing_inputs(macd_line, signal_line, rsi_value):
+    signal = indicators.strategy_signal(pd.Series([macd_line]), pd.Series([signal_line]), pd.Series([rsi_value]))
+    assert list(signal) == ["Hold"]
+
+def test_strategy_signal_rules():
+    signal = indicators.strategy_signal(
+        pd.Series([1.0, -1.0, 1.0, 1.0]),
+        pd.Series([0.0, 0.0, 0.0, 0.0]),
+        pd.Series([60.0, 60.0, 75.0, 52.0]),
+    )
+    assert list(signal) == ["Buy", "Sell", "Sell", "Hold"]
@@ -0,0 +1,117 @@
+import time
+import pytest
+import job_queue
+from job_queue import JobQueue, JobStore, dedup_key
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite"))
+
+def _create(store, request="Analyze AAPL", claimed_by="queue-a", owner=None, **options):
+    return store.create_or_get(dedup_key(request, options), request, options, claimed_by=claimed_by, owner=owner)
+
+def test_identical_pending_requests_share_a_job(store):
+    job_id, created = _create(store, "Analyze  AAPL")
+    again, created_again = _create(store, "analyze aapl", claimed_by="queue-b")
+    other, created_other = _create(store, "Analyze AAPL", precompute=True)
+
+    assert created and not created_again and created_other
+    assert again == job_id and other != job_id
+
+def test_finished_jobs_are_not_reused(store):
+    job_id, _ = _create(store)
+    store.update(job_id, status="done", result="report")
+
+    again, created = _create(store)
+    assert created and again != job_id
+
+def test_live_jobs_are_not_reclaimed(store):
+    job_id, _ = _create(store, claimed_by="queue-a")
+    store.update(job_id, status="running")
+
+    assert store.claim_orphans("queue-b") == []
+    assert store.get(job_id)["claimed_by"] == "queue-a"
+
+def test_orphaned_jobs_are_reclaimed_once(store):
+    job_id, _ = _create(store, claimed_by="queue-a")
+    store.update(job_id, status="running", heartbeat=time.time() - 60)
+
+    assert store.claim_orphans("queue-b", stale_after=30) == [(job_id, "Analyze AAPL", {})]
+    assert store.claim_orphans("queue-c", stale_after=30) == []
+    assert store.get(job_id)["claimed_by"] == "queue-b"
+
+def test_heartbeat_keeps_jobs_owned(store):
+    job_id, _ = _create(store, claimed_by="queue-a")
+    store.update(job_id, heartbeat=time.time() - 60)
+    store.heartbeat("queue-a")
+
+    assert store.claim_orphans("queue-b", stale_after=30) == []
+
+def test_timed_out_jobs_fail_and_stop_collecting_requests(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"), timeout=60)
+    job_id, _ = _create(store)
+    store.update(job_id, status="running", created_at=time.time() - 120)
+
+    job = store.get(job_id)
+    assert job["status"] == "failed" and "Timed out" in job["error"]
+    again, created = _create(store)
+    assert created and again != job_id
+
+def test_queue_resubmits_only_orphaned_jobs_on_start(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.sqlite")
+    store = JobStore(path)
+    orphan, _ = _create(store, "Analyze MSFT", claimed_by="gone")
+    store.update(orphan, status="running", heartbeat=time.time() - 3600)
+    live, _ = _create(store, "Analyze NVDA", claimed_by="other-process")
+    store.update(live, status="running")
+
+    dispatched = []
+    monkeypatch.setattr(JobQueue, "_dispatch", lambda self, job_id, request, options: dispatched.append(job_id))
+    queue = JobQueue(path)
+    try:
+        assert dispatched == [orphan]
+        assert store.get(orphan)["claimed_by"] == queue.claim_id
+        assert store.get(live)["claimed_by"] == "other-process"
+    finally:
+        queue.close()
+
+def test_every_submitter_is_recorded_as_an_owner(store):
+    job_id, _ = _create(store, owner="session-a")
+    _create(store, "analyze aapl", owner="session-b")
+    _create(store, owner="session-a")
+
+    assert store.get(job_id)["owners"] == ["session-a", "session-b"]
+
+class _Lease:
+    members = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class _Pool:
+    def lease(self):
+        return _Lease()
+
+def test_worker_files_the_report_for_every_owner(tmp_path, monkeypatch):
+    pytest.importorskip("autogen")
+    import agent_orchestrator
+    import agent_pool
+    from result_store import ResultStore
+    results = ResultStore(str(tmp_path / "results.sqlite"))
+    monkeypatch.setattr(agent_orchestrator, "orchestrate_agents", lambda request, *members, **options: "the report")
+    monkeypatch.setattr(agent_pool, "get_agent_pool", _Pool)
+    monkeypatch.setattr(job_queue, "get_result_store", lambda: results)
+    path = str(tmp_path / "jobs.sqlite")
+    store = JobStore(path)
+    job_id, _ = _create(store, owner="session-a")
+    _create(store, owner="session-b")
+
+    job_queue._run_job(path, job_id, "Analyze AAPL", {}, {})
+
+    assert store.get(job_id)["status"] == "done"
+    for owner in ("session-a", "session-b"):
+        filed = results.latest("Analyze AAPL", owner=owner)
+        assert filed is not None and results.load(filed["id"]) == "the report"
@@ -0,0 +1,98 @@
+import pytest
+import llm_cache
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from llm_cache import SQLiteLLMCache
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return clock
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "llm_cache.sqlite"), ttl=60)
+    yield cache
+    cache.shutdown()
+
+def test_hit_and_miss_counters(cache):
+    assert cache.get("prompt") is None
+    cache.set("prompt", {"content": "Hold"})
+
+    assert cache.get("prompt") == {"content": "Hold"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+    assert stats["bytes"] > 0
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.set("prompt", "reply")
+    clock.now += 59
+    assert cache.get("prompt") == "reply"
+
+    clock.now += 2
+    assert cache.get("prompt", "expired") == "expired"
+    assert cache.stats()["entries"] == 0
+
+def test_expired_entries_are_evicted_on_write(cache, clock):
+    cache.set("old", "reply")
+    clock.now += 61
+    cache.set("new", "reply")
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["evictions"] == 1
+
+def test_least_recently_used_entry_is_evicted_over_budget(tmp_path, clock):
+    entry_size = len(llm_cache.pickle.dumps("x" * 1000))
+    cache = SQLiteLLMCache(str(tmp_path / "llm_cache.sqlite"), ttl=3600, max_bytes=entry_size * 2)
+    try:
+        cache.set("a", "x" * 1000)
+        clock.now += 1
+        cache.set("b", "x" * 1000)
+        clock.now += 1
+        assert cache.get("a") is not None
+        clock.now += 1
+        cache.set("c", "x" * 1000)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.stats()["evictions"] == 1
+    finally:
+        cache.shutdown()
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    first = SQLiteLLMCache(path)
+    first.set("prompt", "reply")
+    first.shutdown()
+
+    second = SQLiteLLMCache(path)
+    try:
+        assert second.get("prompt") == "reply"
+    finally:
+        second.shutdown()
+
+def test_repeated_completion_is_served_from_cache(cache):
+    autogen = pytest.importorskip("autogen")
+    messages = [{"role": "user", "content": "Analyze AAPL"}]
+    with FakeOpenAIServer() as server:
+        client = autogen.OpenAIWrapper(
+            config_list=[{"model": "fake-model", "api_key": "test", "base_url": server.base_url}]
+        )
+        first = client.create(messages=messages, cache=cache)
+        second = client.create(messages=messages, cache=cache)
+        client.create(messages=[{"role": "user", "content": "Analyze MSFT"}], cache=cache)
+
+        assert server.counters()["llm_calls"] == 2
+    assert client.extract_text_or_completion_object(second) == client.extract_text_or_completion_object(first)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
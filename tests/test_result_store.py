@@ -0,0 +1,57 @@
+import secrets
+import time
+import pytest
+from result_store import ResultStore
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(str(tmp_path / "results.sqlite"))
+
+def test_reports_are_scoped_to_their_owner(store):
+    mine = store.save("Analyze AAPL", "my report", ticker="AAPL", owner="session-a")
+    store.save("Analyze AAPL", "their report", ticker="AAPL", owner="session-b")
+
+    assert store.latest("analyze  aapl", owner="session-a")["id"] == mine
+    assert [entry["id"] for entry in store.history(owner="session-a")] == [mine]
+    assert store.latest("Analyze AAPL", owner="session-c") is None
+    assert len(store.history()) == 2
+
+def test_latest_respects_max_age(store):
+    analysis_id = store.save("Analyze AAPL", "report", ticker="AAPL", owner="a")
+    store._conn.execute("UPDATE analyses SET created_at = ? WHERE id = ?", (time.time() - 7200, analysis_id))
+
+    assert store.latest("Analyze AAPL", max_age=3600, owner="a") is None
+    assert store.latest("Analyze AAPL", owner="a")["id"] == analysis_id
+
+def test_identical_reports_are_stored_once(store):
+    first = store.save("Analyze AAPL", "same report", ticker="AAPL", owner="a")
+    second = store.save("Analyze AAPL", "same report", ticker="AAPL", owner="b")
+
+    assert first != second
+    assert store.stats()["analyses"] == 2 and store.stats()["reports"] == 1
+    assert store.load(first) == store.load(second) == "same report"
+
+def test_expired_analyses_are_dropped(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"), ttl=60)
+    old = store.save("Analyze AAPL", "old report", ticker="AAPL")
+    store._conn.execute("UPDATE analyses SET created_at = ? WHERE id = ?", (time.time() - 120, old))
+    store.save("Analyze MSFT", "new report", ticker="MSFT")
+
+    assert store.load(old) is None
+    assert store.stats()["reports"] == 1 and store.stats()["evictions"] == 1
+
+def test_least_recently_opened_reports_are_evicted_over_budget(tmp_path):
+    # Random text barely compresses, so each body takes about 6 KB.
+    reports = {ticker: secrets.token_urlsafe(6000) for ticker in ("AAPL", "MSFT", "NVDA")}
+    store = ResultStore(str(tmp_path / "results.sqlite"), max_bytes=15_000)
+    ids = {}
+    for ticker in ("AAPL", "MSFT"):
+        ids[ticker] = store.save(f"Analyze {ticker}", reports[ticker], ticker=ticker)
+        time.sleep(0.01)
+    store.load(ids["AAPL"])
+    ids["NVDA"] = store.save("Analyze NVDA", reports["NVDA"], ticker="NVDA")
+
+    assert store.load(ids["MSFT"]) is None
+    assert store.load(ids["AAPL"]) == reports["AAPL"]
+    assert store.load(ids["NVDA"]) == reports["NVDA"]
+    assert store.stats()["bytes"] <= 15_000
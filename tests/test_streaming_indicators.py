@@ -0,0 +1,48 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import indicators
+from streaming_indicators import StreamingIndicatorSet, StreamingRSI, RollingSum
+
+def _closes(seed=0, periods=300):
+    rng = np.random.default_rng(seed)
+    return pd.Series(100 + rng.normal(0, 1, periods).cumsum())
+
+def _assert_matches(streamed, expected):
+    for name, value in expected.items():
+        if np.isnan(value):
+            assert streamed[name] is None, name
+        else:
+            assert streamed[name] == pytest.approx(value, rel=1e-9), name
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_streamed_snapshot_matches_batch_snapshot(seed):
+    closes = _closes(seed)
+    indicator_set = StreamingIndicatorSet()
+    for bar, close in enumerate(closes):
+        streamed = indicator_set.update(close)
+        if bar in (5, 13, 19, 40, len(closes) - 1):
+            _assert_matches(streamed, indicators.snapshot(closes.iloc[:bar + 1].rename("T")).loc["T"])
+
+def test_wilder_rsi_matches_batch_formula():
+    closes = _closes(3)
+    streaming = StreamingRSI(window=14, wilder=True)
+    for close in closes:
+        streaming.update(close)
+    assert streaming.value == pytest.approx(indicators.rsi(closes, window=14, wilder=True).iloc[-1], rel=1e-9)
+
+def test_restored_state_continues_like_the_live_one():
+    closes = _closes(4)
+    live = StreamingIndicatorSet.from_history(closes.iloc[:150])
+    restored = StreamingIndicatorSet.from_dict(json.loads(json.dumps(live.to_dict())))
+    for close in closes.iloc[150:]:
+        assert restored.update(close) == pytest.approx(live.update(close), rel=1e-12)
+    _assert_matches(restored.snapshot(), indicators.snapshot(closes.rename("T")).loc["T"])
+
+def test_rolling_sum_does_not_drift():
+    rolling = RollingSum(20)
+    values = np.random.default_rng(5).normal(1e6, 1e3, 100_000)
+    for value in values:
+        rolling.append(value)
+    assert rolling.total == pytest.approx(values[-20:].sum(), rel=1e-12)
@@ -0,0 +1,78 @@
+import json
+import threading
+import pytest
+
+pytest.importorskip("autogen")
+import workflow
+from workflow import MAX_TOOL_ROUNDS, Workflow, agent_turn
+
+def test_independent_steps_run_concurrently_and_feed_their_dependents():
+    both_running = threading.Barrier(2, timeout=5)
+
+    def branch(value):
+        def step(inputs):
+            both_running.wait()
+            return inputs["start"] + value
+        return step
+
+    outputs = (
+        Workflow()
+        .add("start", lambda inputs: 1)
+        .add("left", branch(10), after=["start"])
+        .add("right", branch(100), after=["start"])
+        .add("total", lambda inputs: inputs["left"] + inputs["right"], after=["left", "right"])
+        .run("total")
+    )
+    assert outputs["total"] == 112
+
+def test_a_failing_step_fails_the_run():
+    ran = []
+
+    def broken(inputs):
+        raise ValueError("no data")
+
+    flow = (
+        Workflow()
+        .add("data", broken)
+        .add("summary", lambda inputs: ran.append("summary"), after=["data"])
+    )
+    with pytest.raises(ValueError, match="no data"):
+        flow.run("summary")
+    assert ran == []
+
+def test_a_step_that_can_never_run_stalls_loudly():
+    flow = Workflow().add("data", lambda inputs: 1)
+    flow.steps["summary"] = (lambda inputs: 2, ("missing",))
+    with pytest.raises(RuntimeError, match="stalled before step summary"):
+        flow.run("summary")
+
+def test_steps_must_depend_on_known_steps():
+    with pytest.raises(ValueError):
+        Workflow().add("summary", lambda inputs: 1, after=["data"])
+    with pytest.raises(ValueError):
+        Workflow().run("summary")
+
+class ToolHungryAgent:
+    """Answers every prompt with another tool call."""
+    name = "technical_analyst"
+
+    def __init__(self):
+        self.replies = 0
+
+    def generate_reply(self, messages, sender):
+        self.replies += 1
+        return {"content": None, "tool_calls": [{
+            "id": f"call-{self.replies}",
+            "function": {"name": "technical_analysis_tool", "arguments": json.dumps({"ticker": "AAPL"})},
+        }]}
+
+def test_agent_turn_does_not_run_tools_it_has_no_round_left_for(monkeypatch):
+    executed = []
+    monkeypatch.setitem(workflow.TOOL_FUNCTIONS, "technical_analysis_tool", lambda ticker: executed.append(ticker) or "{}")
+    agent = ToolHungryAgent()
+
+    content = agent_turn(agent, "Analyze AAPL", sender=None)
+
+    assert agent.replies == MAX_TOOL_ROUNDS + 1
+    assert len(executed) == MAX_TOOL_ROUNDS
+    assert "did not finish" in content
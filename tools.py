@@ -1,16 +1,184 @@
-import yfinance as yf
+import pandas as pd
 import json
+import os
+import threading
+import time
+import functools
+from collections import OrderedDict
+from fetch_scheduler import FetchScheduler
+from history_store import HistoryStore
+import indicators
+from payloads import PayloadEncoder, summarize_closes
+from tracing import tracer
+
+_PERIOD_MONTHS = {"1mo": 1, "3mo": 3, "6mo": 6, "1y": 12, "2y": 24, "5y": 60, "10y": 120}
+
+class MarketDataCache:
+    """Process-wide TTL/LRU cache for ticker info and daily price history.
+
+    History is fetched once per ticker for the widest window any tool needs
+    (``history_period``) and narrower periods are sliced from it. Each ticker
+    has its own lock, so concurrent callers wait for a single upstream fetch
+    instead of issuing their own.
+    """
+    def __init__(self, provider=None, ttl=300, max_entries=256, history_period="6mo"):
+        # The shared scheduler is the only path upstream, so every fetch is rate-limited and batched.
+        self.provider = provider if provider is not None else fetch_scheduler
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.history_period = history_period
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._ticker_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _ticker_lock(self, ticker):
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _cached(self, key, ticker, loader):
+        value = self._get(key)
+        if value is not None:
+            self._count(hit=True)
+            return value
+        with self._ticker_lock(ticker):
+            value = self._get(key)
+            if value is not None:
+                self._count(hit=True)
+                return value
+            self._count(hit=False)
+            tracer.increment("cache_misses")
+            value = loader()
+            self._put(key, value)
+            return value
+
+    def _count(self, hit):
+        if hit:
+            tracer.increment("cache_hits")
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_info(self, ticker):
+        ticker = ticker.upper()
+        return self._cached(("info", ticker), ticker, lambda: self.provider.info(ticker))
+
+    def refresh_infos(self, tickers):
+        """Fetch ``info`` for several tickers in one bulk upstream call and cache it."""
+        tickers = [ticker.upper() for ticker in tickers]
+        if hasattr(self.provider, "infos"):
+            infos = self.provider.infos(tickers)
+        else:
+            infos = {ticker: self.provider.info(ticker) for ticker in tickers}
+        for ticker, info in infos.items():
+            if info:
+                self._put(("info", ticker.upper()), info)
+        return {ticker.upper(): info for ticker, info in infos.items()}
+
+    def get_history(self, ticker, period="6mo", interval="1d"):
+        ticker = ticker.upper()
+        months = _PERIOD_MONTHS.get(period)
+        window = _PERIOD_MONTHS[self.history_period]
+        if interval != "1d" or months is None or months > window:
+            key = ("history", ticker, period, interval)
+            return self._cached(key, ticker, lambda: self.provider.history(ticker, period=period, interval=interval)).copy()
+        data = self._cached(
+            ("history", ticker, self.history_period, interval),
+            ticker,
+            lambda: self.provider.history(ticker, period=self.history_period, interval=interval),
+        )
+        if months == window or data.empty:
+            return data.copy()
+        cutoff = pd.Timestamp.now(tz=data.index.tz) - pd.DateOffset(months=months)
+        return data[data.index >= cutoff].copy()
+
+    def get_close_matrix(self, tickers, period="6mo"):
+        closes = {ticker.upper(): self.get_history(ticker, period=period)["Close"] for ticker in tickers}
+        return pd.DataFrame(closes).sort_index()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+HISTORY_STORE_DIR = os.environ.get(
+    "STOCK_HISTORY_DIR", os.path.join(os.path.expanduser("~"), ".cache", "stock_analysis", "history")
+)
+
+fetch_scheduler = FetchScheduler(
+    rate=float(os.environ.get("FETCH_RATE", 2)),
+    burst=int(os.environ.get("FETCH_BURST", 4)),
+    max_batch=int(os.environ.get("FETCH_MAX_BATCH", 20)),
+    max_retries=int(os.environ.get("FETCH_RETRIES", 3)),
+)
+market_data = MarketDataCache(
+    HistoryStore(HISTORY_STORE_DIR, source=fetch_scheduler) if HISTORY_STORE_DIR else fetch_scheduler
+)
+payload_encoder = PayloadEncoder()
+
+def _latest_indicators(ticker, period):
+    close = market_data.get_history(ticker, period=period)["Close"]
+    latest = indicators.snapshot(close.to_frame(ticker)).loc[ticker]
+    if latest.isna().any():
+        raise ValueError(f"not enough price history ({len(close)} bars)")
+    return latest
+
+def _traced_tool(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(f"tool.{name}") as span:
+                result = func(*args, **kwargs)
+                span.attributes["bytes"] = len(result)
+                if result.startswith('{"error"'):
+                    span.status = "error"
+                return result
+        return wrapper
+    return decorator
 
 class FinanceTools:
     """Handles financial data fetching and analysis tools."""
     @staticmethod
+    @_traced_tool("finance_data_fetch")
     def finance_data_fetch(ticker: str, period: str = "1mo") -> str:
         try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period=period).to_dict()
-            converted_hist = {key: {str(k): v for k, v in value.items()} for key, value in hist.items()}
-            info = stock.info
-            
+            hist = market_data.get_history(ticker, period=period)
+            info = market_data.get_info(ticker)
+
             summary = {
                 "name": info.get("shortName", ticker),
                 "symbol": ticker,
@@ -21,38 +189,27 @@ class FinanceTools:
                 "peRatio": info.get("trailingPE"),
                 "priceToBook": info.get("priceToBook"),
                 "dividend": info.get("dividendRate"),
-                "recentClosePrices": converted_hist.get("Close", {})
+                "recentClosePrices": summarize_closes(hist["Close"])
             }
-            return json.dumps({"name": "finance_data_fetch", "data": summary})
+            return payload_encoder.encode("finance_data_fetch", summary)
         except Exception as e:
             return json.dumps({"error": f"Failed to fetch data for {ticker}: {str(e)}"})
 
     @staticmethod
+    @_traced_tool("technical_analysis_tool")
     def technical_analysis_tool(ticker: str) -> str:
         try:
-            data = yf.Ticker(ticker).history(period="3mo")
-            data['SMA_20'] = data['Close'].rolling(window=20).mean()
-            data['EMA_20'] = data['Close'].ewm(span=20, adjust=False).mean()
-            delta = data['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            data['RSI'] = 100 - (100 / (1 + rs))
-
-            summary = {
-                "SMA_20": data['SMA_20'].dropna().iloc[-1],
-                "EMA_20": data['EMA_20'].dropna().iloc[-1],
-                "RSI": data['RSI'].dropna().iloc[-1],
-                "Last_Close": data['Close'].iloc[-1]
-            }
-            return json.dumps({"name": "technical_analysis_tool", "data": summary})
+            latest = _latest_indicators(ticker, period="3mo")
+            summary = {key: latest[key] for key in ["SMA_20", "EMA_20", "RSI", "Last_Close"]}
+            return payload_encoder.encode("technical_analysis_tool", summary)
         except Exception as e:
             return json.dumps({"error": f"Technical analysis failed for {ticker}: {str(e)}"})
 
     @staticmethod
+    @_traced_tool("risk_assessment_tool")
     def risk_assessment_tool(ticker: str) -> str:
         try:
-            info = yf.Ticker(ticker).info
+            info = market_data.get_info(ticker)
             summary = {
                 "Beta": info.get("beta"),
                 "MarketCap": info.get("marketCap"),
@@ -60,46 +217,36 @@ class FinanceTools:
                 "Volatility": info.get("52WeekChange"),
                 "RiskRating": "High" if info.get("beta", 1.0) > 1.2 else "Moderate" if info.get("beta", 0.9) > 0.8 else "Low"
             }
-            return json.dumps({"name": "risk_assessment_tool", "data": summary})
+            return payload_encoder.encode("risk_assessment_tool", summary)
         except Exception as e:
             return json.dumps({"error": f"Risk assessment failed for {ticker}: {str(e)}"})
 
     @staticmethod
+    @_traced_tool("strategy_signal_tool")
     def strategy_signal_tool(ticker: str) -> str:
         try:
-            data = yf.Ticker(ticker).history(period="6mo", interval="1d")
-            close = data['Close']
-            ema12 = close.ewm(span=12, adjust=False).mean()
-            ema26 = close.ewm(span=26, adjust=False).mean()
-            macd = ema12 - ema26
-            signal = macd.ewm(span=9, adjust=False).mean()
-            delta = close.diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-
-            summary = {
-                "MACD": macd.dropna().iloc[-1],
-                "MACD_Signal": signal.dropna().iloc[-1],
-                "RSI": rsi.dropna().iloc[-1],
-                "Last_Close": close.iloc[-1]
-            }
-            return json.dumps({"name": "strategy_signal_tool", "data": summary})
+            latest = _latest_indicators(ticker, period="6mo")
+            summary = {key: latest[key] for key in ["MACD", "MACD_Signal", "RSI", "Last_Close"]}
+            return payload_encoder.encode("strategy_signal_tool", summary)
         except Exception as e:
             return json.dumps({"error": f"Strategy signal analysis failed for {ticker}: {str(e)}"})
 
+    @staticmethod
+    def indicator_snapshot(tickers, period="6mo"):
+        return indicators.snapshot(market_data.get_close_matrix(tickers, period=period))
+
+    @staticmethod
+    def format_stock_metrics(info):
+        return {
+            "Current Price": f"${info.get('currentPrice', 'N/A'):.2f}" if info.get('currentPrice') else "N/A",
+            "Market Cap": f"${info.get('marketCap', 0)/1e9:.2f}B" if info.get('marketCap') else "N/A",
+            "P/E Ratio": f"{info.get('trailingPE', 'N/A'):.2f}" if info.get('trailingPE') else "N/A",
+            "Beta": f"{info.get('beta', 'N/A'):.2f}" if info.get('beta') else "N/A"
+        }
+
     @staticmethod
     def get_stock_metrics(ticker):
         try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            metrics = {
-                "Current Price": f"${info.get('currentPrice', 'N/A'):.2f}" if info.get('currentPrice') else "N/A",
-                "Market Cap": f"${info.get('marketCap', 0)/1e9:.2f}B" if info.get('marketCap') else "N/A",
-                "P/E Ratio": f"{info.get('trailingPE', 'N/A'):.2f}" if info.get('trailingPE') else "N/A",
-                "Beta": f"{info.get('beta', 'N/A'):.2f}" if info.get('beta') else "N/A"
-            }
-            return metrics
+            return FinanceTools.format_stock_metrics(market_data.get_info(ticker))
         except Exception as e:
-            return {"Error": f"Could not fetch metrics: {str(e)}"}
\ No newline at end of file
+            return {"Error": f"Could not fetch metrics: {str(e)}"}
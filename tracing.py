@@ -0,0 +1,230 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from agent_hooks import MESSAGE_HOOK
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """One timed stage of an analysis (tool call, upstream fetch, LLM request, chat round)."""
+    def __init__(self, name, trace_id, parent_id=None, attributes=None, start=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start = time.time() if start is None else start
+        self.duration = None
+        self.status = "ok"
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": None if self.duration is None else self.duration * 1000,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def to_otlp(spans, service_name="stock-analysis"):
+    """Convert finished spans to an OTLP/JSON ``ExportTraceServiceRequest`` body."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{
+            "scope": {"name": "stock_analysis.tracing"},
+            "spans": [{
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(int(span.start * 1e9)),
+                "endTimeUnixNano": str(int((span.start + (span.duration or 0)) * 1e9)),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+                "status": {"code": 1 if span.status == "ok" else 2},
+            } for span in spans],
+        }],
+    }]}
+
+class JSONLExporter:
+    """Appends each finished span as one JSON line."""
+    def __init__(self, path, otlp=False):
+        self.path = path
+        self.otlp = otlp
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        record = to_otlp([span]) if self.otlp else span.to_dict()
+        line = json.dumps(record, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+class Tracer:
+    """Collects spans for tools, upstream fetches, LLM requests and chat rounds.
+
+    Finished spans are kept in a bounded in-memory buffer for the UI and
+    handed to every exporter. The active span follows ``contextvars``, so
+    nested stages share a trace.
+    """
+    def __init__(self, max_spans=5000, exporters=None):
+        self.exporters = list(exporters or [])
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attributes):
+        parent = _current_span.get()
+        span = Span(
+            name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes,
+        )
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes["error"] = str(e)
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current_span.reset(token)
+            self._finish(span)
+
+    def record(self, name, start, duration, **attributes):
+        """Record a span for a stage that was timed outside a ``with`` block."""
+        parent = _current_span.get()
+        span = Span(
+            name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes,
+            start=start,
+        )
+        span.duration = duration
+        self._finish(span)
+        return span
+
+    def _finish(self, span):
+        with self._lock:
+            self._spans.append(span)
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception:
+                pass
+
+    def traced(self, name):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def current():
+        return _current_span.get()
+
+    def set_attribute(self, key, value):
+        span = _current_span.get()
+        if span is not None:
+            span.attributes[key] = value
+
+    def increment(self, key, amount=1):
+        span = _current_span.get()
+        if span is not None:
+            span.attributes[key] = span.attributes.get(key, 0) + amount
+
+    def spans(self, trace_id=None):
+        with self._lock:
+            return [s for s in self._spans if trace_id is None or s.trace_id == trace_id]
+
+    def breakdown(self, trace_id):
+        """Per-stage totals for one trace: count, time and summed numeric attributes."""
+        stages = {}
+        for span in self.spans(trace_id):
+            stage = stages.setdefault(span.name, {"stage": span.name, "count": 0, "total_ms": 0.0})
+            stage["count"] += 1
+            stage["total_ms"] += (span.duration or 0) * 1000
+            for key in ("bytes", "prompt_tokens", "completion_tokens", "cache_hits", "cache_misses"):
+                if key in span.attributes:
+                    stage[key] = stage.get(key, 0) + span.attributes[key]
+        return sorted(stages.values(), key=lambda s: s["total_ms"], reverse=True)
+
+def _default_exporters():
+    exporters = []
+    if os.environ.get("TRACE_JSONL_PATH"):
+        exporters.append(JSONLExporter(os.environ["TRACE_JSONL_PATH"]))
+    if os.environ.get("TRACE_OTLP_PATH"):
+        exporters.append(JSONLExporter(os.environ["TRACE_OTLP_PATH"], otlp=True))
+    return exporters
+
+tracer = Tracer(exporters=_default_exporters())
+
+def run_in_context(executor, func, *args):
+    """Submit ``func`` to ``executor`` so it runs inside the caller's trace."""
+    return executor.submit(contextvars.copy_context().run, func, *args)
+
+@contextmanager
+def _traced_llm_client(agent):
+    client = getattr(agent, "client", None)
+    if client is None:
+        yield
+        return
+    original = client.create
+
+    def create(*args, **kwargs):
+        with tracer.span("llm.request", agent=agent.name) as span:
+            response = original(*args, **kwargs)
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                span.attributes["prompt_tokens"] = getattr(usage, "prompt_tokens", 0) or 0
+                span.attributes["completion_tokens"] = getattr(usage, "completion_tokens", 0) or 0
+            span.attributes["model"] = getattr(response, "model", "")
+            return response
+
+    client.create = create
+    try:
+        yield
+    finally:
+        del client.create
+
+@contextmanager
+def trace_conversation(agents):
+    """Trace every LLM request of ``agents`` and one span per group-chat round."""
+    last_message_at = [time.time()]
+
+    def on_send(sender, message, recipient, silent):
+        now = time.time()
+        tracer.record("groupchat.round", last_message_at[0], now - last_message_at[0], speaker=sender.name)
+        last_message_at[0] = now
+        return message
+
+    with ExitStack() as stack:
+        for agent in agents:
+            stack.enter_context(_traced_llm_client(agent))
+            agent.register_hook(MESSAGE_HOOK, on_send)
+            stack.callback(agent.hook_lists[MESSAGE_HOOK].remove, on_send)
+        yield
@@ -0,0 +1,165 @@
+import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from agent_config import AgentConfig
+from agent_orchestrator import TOOL_FUNCTIONS, build_seeded_request, extract_ticker, precompute_tool_results
+from streaming import message_events, stream_conversation, tool_result_event
+from tracing import run_in_context, trace_conversation, tracer
+
+# Tool-call round-trips an agent may make when its data was not pre-computed.
+MAX_TOOL_ROUNDS = 3
+
+class Workflow:
+    """Dependency graph of steps, each run as soon as all of its inputs exist.
+
+    Steps whose dependencies are satisfied run concurrently on a thread
+    pool; each receives its dependencies' outputs by name. ``run`` returns
+    once the ``final`` step has produced its output. Dependencies must be
+    added before the steps that use them, so the graph is always acyclic.
+    """
+    def __init__(self):
+        self.steps = {}
+
+    def add(self, name, func, after=()):
+        unknown = [dep for dep in after if dep not in self.steps]
+        if unknown:
+            raise ValueError(f"step {name} depends on unknown steps {unknown}")
+        self.steps[name] = (func, tuple(after))
+        return self
+
+    def _run_step(self, name, func, inputs):
+        with tracer.span(f"workflow.{name}"):
+            return func(inputs)
+
+    def run(self, final, max_workers=4):
+        if final not in self.steps:
+            raise ValueError(f"unknown final step {final}")
+        outputs, running = {}, {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="workflow") as pool:
+            while final not in outputs:
+                for name, (func, after) in self.steps.items():
+                    ready = all(dep in outputs for dep in after)
+                    if ready and name not in outputs and name not in running.values():
+                        inputs = {dep: outputs[dep] for dep in after}
+                        running[run_in_context(pool, self._run_step, name, func, inputs)] = name
+                if not running:
+                    raise RuntimeError(f"workflow stalled before step {final}: no step is ready to run")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    outputs[running.pop(future)] = future.result()
+        return outputs
+
+@contextmanager
+def _client_cache(agents, cache):
+    previous = [agent.client_cache for agent in agents]
+    for agent in agents:
+        agent.client_cache = cache
+    try:
+        yield
+    finally:
+        for agent, value in zip(agents, previous):
+            agent.client_cache = value
+
+def agent_turn(agent, prompt, sender, on_message=None):
+    """One agent answering ``prompt`` directly, executing any tool calls it makes locally."""
+    messages = [{"role": "user", "content": prompt}]
+    for round_number in range(MAX_TOOL_ROUNDS + 1):
+        reply = agent.generate_reply(messages=messages, sender=sender)
+        if not isinstance(reply, dict) or not reply.get("tool_calls"):
+            break
+        if round_number == MAX_TOOL_ROUNDS:
+            # Out of rounds: running these calls would only discard their results.
+            break
+        if on_message:
+            for event in message_events(agent.name, {"tool_calls": reply["tool_calls"]}):
+                on_message(event)
+        messages.append({"role": "assistant", "content": reply.get("content"), "tool_calls": reply["tool_calls"]})
+        for call in reply["tool_calls"]:
+            name = call["function"]["name"]
+            try:
+                result = TOOL_FUNCTIONS[name](**json.loads(call["function"].get("arguments") or "{}"))
+            except (KeyError, TypeError, ValueError) as e:
+                result = json.dumps({"error": f"Invalid tool call {name}: {str(e)}"})
+            if on_message:
+                on_message(tool_result_event(name, result))
+            messages.append({"role": "tool", "tool_call_id": call["id"], "content": result})
+    if isinstance(reply, dict) and reply.get("tool_calls"):
+        content = f"{agent.name} did not finish within {MAX_TOOL_ROUNDS} tool calls."
+    else:
+        content = (reply.get("content") if isinstance(reply, dict) else reply) or ""
+    if on_message:
+        for event in message_events(agent.name, content):
+            on_message(event)
+    return content
+
+def assemble_summary(ticker, report, technical, strategy):
+    return "\n\n".join([
+        f"# Stock Analysis: {ticker}" if ticker else "# Stock Analysis",
+        "## Recommendation",
+        strategy,
+        "## Financial Report",
+        report,
+        "## Technical Analysis",
+        technical,
+    ])
+
+def run_analysis_workflow(user_request, finance_reporting_analyst, technical_analyst, strategy_agent, user,
+                          precompute=True, use_cache=True, on_message=None, on_token=None):
+    """The supervisor's plan as a DAG: tool data, then the reporting and
+    technical analysts in parallel, then the strategy agent on their combined
+    output, then the final summary. Each agent speaks exactly once."""
+    ticker = extract_ticker(user_request)
+
+    def prompt(tool_results, names, *sections):
+        seeded = {name: tool_results[name] for name in names if name in tool_results}
+        request = build_seeded_request(user_request, ticker, seeded) if seeded else user_request
+        return "\n\n".join([request, *sections])
+
+    def data(inputs):
+        if not (precompute and ticker):
+            return {}
+        on_result = None
+        if on_message:
+            on_result = lambda name, result: on_message(tool_result_event(name, result))
+        return precompute_tool_results(ticker, on_result=on_result)
+
+    def report(inputs):
+        return agent_turn(
+            finance_reporting_analyst, prompt(inputs["data"], ["finance_data_fetch"]), user, on_message
+        )
+
+    def technical(inputs):
+        return agent_turn(
+            technical_analyst, prompt(inputs["data"], ["technical_analysis_tool"]), user, on_message
+        )
+
+    def strategy(inputs):
+        # The only LLM step running alone, so the only one whose tokens can be streamed without interleaving.
+        with stream_conversation([], on_token=on_token):
+            return agent_turn(
+                strategy_agent,
+                prompt(
+                    inputs["data"],
+                    ["risk_assessment_tool", "strategy_signal_tool"],
+                    f"### finance_reporting_analyst report\n{inputs['report']}",
+                    f"### technical_analyst insights\n{inputs['technical']}",
+                ),
+                user,
+                on_message,
+            )
+
+    def summary(inputs):
+        return assemble_summary(ticker, inputs["report"], inputs["technical"], inputs["strategy"])
+
+    workflow = (
+        Workflow()
+        .add("data", data)
+        .add("report", report, after=["data"])
+        .add("technical", technical, after=["data"])
+        .add("strategy", strategy, after=["data", "report", "technical"])
+        .add("summary", summary, after=["report", "technical", "strategy"])
+    )
+    agents = [user, finance_reporting_analyst, technical_analyst, strategy_agent]
+    cache = AgentConfig.get_llm_cache() if use_cache else None
+    with _client_cache(agents, cache), trace_conversation(agents), tracer.span("workflow", ticker=ticker or ""):
+        return workflow.run("summary")["summary"]